@@ -3,148 +3,158 @@ from convert import Precision
 
 class Access:
 	@staticmethod
-	def data(addr, flow=["var"]):
+	def data(addr, flow=["var"], machine=None):
 		"""
 		Loads the value that follows the flow from the specified address.
 		Flow options: "var" (variable), "reg" (register), "mem" (memory)
 		"""
+		machine = machine or storage.machine
 		for flow_type in flow:
 			try:
 				if flow_type == "var":
 					# First try to get address from variable storage
-					actual_addr = storage.variable.load(addr)
-					return storage.register.load(int(actual_addr))
+					actual_addr = machine.variable.load(addr)
+					return machine.register.load(int(actual_addr))
 				elif flow_type == "reg":
-					return storage.register.load(int(addr))
+					return machine.register.load(int(addr))
 				elif flow_type == "mem":
-					return storage.memory.load(int(addr))
+					return machine.memory.load(int(addr))
 			except KeyError:
 				continue
 		
 		# If all flow types fail, raise an exception
 		raise KeyError(f"Address {addr} not found in any of the specified storage types: {flow}")
 	
-	def store(typ, addr, value):
+	def store(typ, addr, value, machine=None):
 		"""
 		Store the value to the specified storage (memory or register) and address.
 		typ: "reg" for register, "mem" for memory, "var" for variable
 		"""
+		machine = machine or storage.machine
 		if typ == "reg":
-			storage.register.store(addr, value)
+			machine.register.store(addr, value)
 		elif typ == "mem":
-			storage.memory.store(addr, value)
+			machine.memory.store(addr, value)
 		elif typ == "var":
 			# For variable, store the mapping in variable storage
-			storage.variable.store(addr, value)
+			machine.variable.store(addr, value)
 		else:
 			raise ValueError(f"Invalid storage type: {typ}")
 
 class AddressingMode:
 	@staticmethod
-	def immediate(var):
+	def immediate(var, machine=None):
 		"""
 		Immediate addressing mode - returns the value directly
 		"""
 		return var
 	
-	def indexed(displace):
+	def indexed(displace, machine=None):
 		"""
 		Indexed addressing mode with displacement from index register
 		"""
+		machine = machine or storage.machine
 		try:
 			# Get the index register value (I1 for first operand, I2 for second)
-			index_addr = storage.variable.load("I1")  # Default to I1
-			index_value = storage.register.load(int(index_addr))
+			index_addr = machine.variable.load("I1")  # Default to I1
+			index_value = machine.register.load(int(index_addr))
 			
 			# Calculate effective address using Precision for proper conversion
 			effective_addr = int(Precision.spbin2dec(Precision.dec2spbin(displace + index_value)))
 			
 			# Return the value at the effective address
-			return storage.memory.load(int(effective_addr))
+			return machine.memory.load(int(effective_addr))
 		except KeyError:
 			raise KeyError(f"Index register not found or invalid displacement")
 	
-	def register(reg_addr):
+	def register(reg_addr, machine=None):
 		"""
 		Register addressing mode - returns value from register at reg_addr
 		"""
-		return storage.register.load(int(reg_addr))
+		machine = machine or storage.machine
+		return machine.register.load(int(reg_addr))
 	
-	def register_indirect(reg_addr):
+	def register_indirect(reg_addr, machine=None):
 		"""
 		Register indirect addressing mode - register contains address of actual data
 		"""
+		machine = machine or storage.machine
 		# Get address from register (already converted by storage.load)
-		addr = storage.register.load(int(reg_addr))
+		addr = machine.register.load(int(reg_addr))
 		# Convert to integer address using Precision
 		mem_addr = int(Precision.spbin2dec(Precision.dec2spbin(addr)))
 		# Use that address to get the actual value from memory
-		return storage.memory.load(int(mem_addr))
+		return machine.memory.load(int(mem_addr))
 	
-	def direct(var_addr):
+	def direct(var_addr, machine=None):
 		"""
 		Direct addressing mode - direct access to memory address var_addr
 		"""
-		return storage.memory.load(int(var_addr))
+		machine = machine or storage.machine
+		return machine.memory.load(int(var_addr))
 	
-	def indirect(var_addr):
+	def indirect(var_addr, machine=None):
 		"""
 		Indirect addressing mode - memory location contains address of actual data
 		"""
+		machine = machine or storage.machine
 		# Get address from memory (already converted by storage.load)
-		addr = storage.memory.load(int(var_addr))
+		addr = machine.memory.load(int(var_addr))
 		# Convert to integer address using Precision
 		mem_addr = int(Precision.spbin2dec(Precision.dec2spbin(addr)))
 		# Use that address to get the actual value
-		return storage.memory.load(int(mem_addr))
+		return machine.memory.load(int(mem_addr))
 	
-	def autoinc(reg_addr):
+	def autoinc(reg_addr, machine=None):
 		"""
 		Auto-increment addressing mode - use register value then increment it
 		"""
+		machine = machine or storage.machine
 		# Get current value from register (already converted by storage.load)
-		addr = storage.register.load(int(reg_addr))
+		addr = machine.register.load(int(reg_addr))
 		# Convert to integer address for memory access
 		mem_addr = int(Precision.spbin2dec(Precision.dec2spbin(addr)))
 		# Get data from memory at that address
-		data = storage.memory.load(int(mem_addr))
+		data = machine.memory.load(int(mem_addr))
 		# Increment the register value using Precision
 		incremented = Precision.spbin2dec(Precision.dec2spbin(addr + 1))
-		storage.register.store(reg_addr, incremented)
+		machine.register.store(reg_addr, incremented)
 		return data
 	
-	def autodec(reg_addr):
+	def autodec(reg_addr, machine=None):
 		"""
 		Auto-decrement addressing mode - decrement register then use its value
 		"""
+		machine = machine or storage.machine
 		# Get current value from register and decrement using Precision
-		current_addr = storage.register.load(int(reg_addr))
+		current_addr = machine.register.load(int(reg_addr))
 		decremented = Precision.spbin2dec(Precision.dec2spbin(current_addr - 1))
 		# Store decremented value back to register
-		storage.register.store(reg_addr, decremented)
+		machine.register.store(reg_addr, decremented)
 		# Convert to integer address for memory access
 		mem_addr = int(Precision.spbin2dec(Precision.dec2spbin(decremented)))
 		# Get data from memory at decremented address
-		return storage.memory.load(int(mem_addr))
+		return machine.memory.load(int(mem_addr))
 	
-	def stack(stack_option):
+	def stack(stack_option, machine=None):
 		"""
 		Stack addressing mode with stack option (push, pop, or top).
 		Pop and top returns the address of the stack top.
 		Push inserts the address at the stack top while pop removes the address from the stack.
 		Uses SPR (Stack Pointer Register) and TSP (Top Stack Pointer)
 		"""
+		machine = machine or storage.machine
 		# Get stack pointer addresses
-		spr_addr = storage.variable.load("SPR")
-		tsp_addr = storage.variable.load("TSP")
+		spr_addr = machine.slots["SPR"]
+		tsp_addr = machine.slots["TSP"]
 		
 		# Get current stack pointer and top stack pointer (already converted by storage.load)
-		stack_ptr = storage.register.load(int(spr_addr))
-		top_stack_ptr = storage.register.load(int(tsp_addr))
+		stack_ptr = machine.register.load(spr_addr)
+		top_stack_ptr = machine.register.load(tsp_addr)
 		
 		if stack_option.lower() == "push":
 			new_top = top_stack_ptr + 1
-			storage.register.store(tsp_addr, new_top)
+			machine.register.store(tsp_addr, new_top)
 			return new_top
 			
 		elif stack_option.lower() == "pop":
@@ -152,7 +162,7 @@ class AddressingMode:
 			if top_stack_ptr <= stack_ptr:
 				raise RuntimeError("Stack underflow")
 			current_top = top_stack_ptr
-			storage.register.store(tsp_addr, current_top - 1)
+			machine.register.store(tsp_addr, current_top - 1)
 			return current_top
 			
 		elif stack_option.lower() == "top":
@@ -0,0 +1,349 @@
+import time
+import storage
+import tracing
+from compiler import operations, operationCodes
+from convert import Length, Value, Words
+from objfile import ObjectFile, ObjectWriter
+from peephole import Peephole
+
+opcodes = {op: int(operationCodes[0][i] + operationCodes[1][j], 2)
+           for i, group in enumerate(operations)
+           for j, op in enumerate(group)}
+conditionalJumps = ["JEQ", "JNE", "JLT", "JLE", "JGT", "JGE"]
+declarations = ["DEF", "DEV", "DEB"]
+indexModes = {"I1": 0b100, "I2": 0b101}
+addrLimit = 2**Length.opAddr
+
+
+class AssemblyError(Exception):
+    def __init__(self, lineno, line, msg):
+        super().__init__(f"line {lineno}: {msg}: {line.strip()}")
+        self.lineno = lineno
+        self.line = line
+        self.msg = msg
+
+
+def sourceLines(filename):
+    """
+    (lineno, line) of a source file read lazily, without blanks and // comments; the numbers
+    are those of the file, for error messages.
+    """
+    with open(filename, "r") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if line and not line.startswith("//"):
+                yield lineno, line
+
+
+class SourceFile:
+    """
+    A source file that is assembled while it is read: Program(SourceFile(name)) streams it into
+    the machine without holding the source lines or their encodings.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.assembler = None
+
+    def load(self, machine):
+        self.assembler = Assembler(machine)
+        count = self.assembler.streamInto(sourceLines(self.filename))
+        return machine.memory.words(0, count)
+
+
+class Assembler:
+    """
+    Two-pass assembler.
+    Pass one collects labels ("name:") and DEF/DEV/DEB declarations into a dict symbol table
+    and lays out the instruction addresses; pass two encodes every operand with dict lookups.
+    Accepts the same operand syntax as Instruction.encodeOp: R3, @R3, &x, #5, x, A1[I1], PUSH, POP,
+    plus numeric displacements such as 72[I1]. A bare label assembles as an immediate holding its
+    instruction address, so a jump carries its target; a bare DEF name reads the variable's word.
+    Any other name is undefined and raises an AssemblyError with its line number.
+    """
+    def __init__(self, machine=None, optimize=False):
+        self.machine = machine or storage.machine
+        # machine variables decoded once: R#, M#, A#, I# and the specialized registers
+        self.symbols = {name: int(self.machine.variable.load(name)) for name in self.machine.variable.data}
+        self.data = {}
+        self.labels = set()
+        self.lines = 0
+        self.seconds = 0.0
+        self.fixups = None  # deferred operands while streaming
+        self.unresolved = None  # the undefined name the last operand looked up
+        self.used = None  # symbol names looked up by encodeOp, when collected
+        self.optimizer = Peephole(self) if optimize else None
+
+    def assemble(self, program):
+        """
+        Assembles source lines (or (lineno, line) pairs) into an ObjectFile.
+        """
+        start = time.perf_counter()
+        statements = self.firstPass(program)
+        if self.optimizer is not None:
+            code = [self.encode(lineno, line, op, operands, address, extra)
+                    for address, (lineno, line, op, operands, extra) in enumerate(self.optimizer.run(statements))]
+        else:
+            code = [self.encode(lineno, line, op, operands, address)
+                    for address, (lineno, line, op, operands) in enumerate(statements)]
+        self.seconds += time.perf_counter() - start
+        base, data = self.dataImage()
+        return ObjectFile(code, data, base, self.symbols)
+
+    def dataImage(self):
+        # (base address, packed words) of the DEF/DEV/DEB variables
+        base = min(self.data, default=0)
+        data = [0.0] * (max(self.data, default=-1) + 1 - base)
+        for address, value in self.data.items():
+            data[address - base] = value
+        return base, Words.dec2words(data)
+
+    def stream(self, program):
+        """
+        Single pass over source lines: yields (address, word) for each instruction as soon as it is read.
+        Operands naming symbols that are not defined yet are left zero; patches() encodes them once
+        the whole source has been read, and raises for names that never were.
+        """
+        self.fixups = []
+        start = time.perf_counter()
+        try:
+            for address, (lineno, line, op, operands) in enumerate(self.parse(program)):
+                yield address, self.encode(lineno, line, op, operands, address)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def patches(self):
+        # (address, operand field) of every deferred operand, to be or-ed into the streamed word
+        fixups, self.fixups = self.fixups, None
+        for address, shift, lineno, line, operand in fixups:
+            self.unresolved = None
+            mode, addr = self.encodeOp(lineno, line, operand)
+            if self.unresolved is not None:
+                raise AssemblyError(lineno, line, f"undefined symbol {self.unresolved}")
+            if not 0 <= addr < addrLimit:
+                raise AssemblyError(lineno, line, f"operand {operand} does not fit in {Length.opAddr} bits")
+            yield address, (mode << Length.opAddr | addr) << shift
+
+    def streamInto(self, program):
+        """
+        Streams source lines straight into the machine: code words, then patches, data and symbols.
+        Returns the number of instruction words.
+        """
+        memory = self.machine.memory
+        count = 0
+        for address, word in self.stream(program):
+            memory.storeWord(address, word)
+            count += 1
+        for address, field in self.patches():
+            memory.storeWord(address, memory.loadWord(address) | field)
+        base, data = self.dataImage()
+        if len(data):
+            memory.storeWords(base, data)
+        self.machine.setSymbols(self.symbols)
+        return count
+
+    def streamObject(self, program, filename, source_hash=bytes(32)):
+        """
+        Streams source lines into an object file without keeping the code in memory.
+        """
+        writer = ObjectWriter(filename)
+        try:
+            for address, word in self.stream(program):
+                writer.write(word)
+            for address, field in self.patches():
+                writer.patch(address, field)
+            base, data = self.dataImage()
+            writer.close(data, base, self.symbols, source_hash)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.count
+
+    def throughput(self):
+        return self.lines / self.seconds if self.seconds else 0.0
+
+    def firstPass(self, program):
+        return list(self.parse(program))
+
+    def parse(self, program):
+        """
+        (lineno, line, operation, operands) per instruction; labels and declarations are recorded
+        in the symbol table as they are read.
+        """
+        count = 0
+        for lineno, line in self.numbered(program):
+            self.lines += 1
+            parts = line.split()
+            while parts and parts[0].endswith(":"):
+                label = parts.pop(0)[:-1]
+                self.define(lineno, line, label, count)
+                self.labels.add(label)
+            if not parts:
+                continue
+            op = parts[0].upper()
+            if op in declarations:
+                if len(parts) not in (2, 3):
+                    raise AssemblyError(lineno, line, f"{op} takes a name and an optional value")
+                next_var = self.machine.layout.mvpr + len(self.data)
+                if next_var >= self.machine.layout.mmpr:
+                    raise AssemblyError(lineno, line, "variable region is full")
+                value = parts[2] if len(parts) == 3 else "0"
+                if not Value.isNumber(value):
+                    raise AssemblyError(lineno, line, f"invalid value {value}")
+                self.define(lineno, line, parts[1], next_var)
+                self.data[next_var] = float(value)
+            elif op in conditionalJumps and len(parts) == 4:
+                # compare-and-branch expands like Instruction.preEncode
+                yield lineno, line, "SUB", parts[1:3]
+                yield lineno, line, op, parts[3:]
+                count += 2
+            elif op not in opcodes:
+                raise AssemblyError(lineno, line, f"unknown operation {op}")
+            elif len(parts) > 3:
+                raise AssemblyError(lineno, line, "too many operands")
+            else:
+                yield lineno, line, op, parts[1:]
+                count += 1
+
+    @staticmethod
+    def numbered(program):
+        for lineno, line in enumerate(program, 1):
+            if type(line) == type(tuple()):
+                lineno, line = line
+            yield lineno, line
+
+    def define(self, lineno, line, name, address):
+        if not name or name in self.symbols:
+            raise AssemblyError(lineno, line, f"symbol {name!r} is already defined")
+        self.symbols[name] = address
+
+    def encode(self, lineno, line, op, operands, address=None, extra=0):
+        word = opcodes[op] << (Length.instrxn - 5)
+        shift = Length.instrxn - 5
+        tracer = tracing.tracer
+        for operand in operands:
+            if tracer is not None:
+                tracer.emit(tracing.DEBUG, "encode", address, op, (operand,))
+            self.unresolved = None
+            mode, addr = self.encodeOp(lineno, line, operand)
+            shift -= Length.operand
+            if self.unresolved is not None:
+                if self.fixups is None:
+                    raise AssemblyError(lineno, line, f"undefined symbol {self.unresolved}")
+                # possibly a forward reference, encoded by patches()
+                self.fixups.append((address, shift, lineno, line, operand))
+                continue
+            if not 0 <= addr < addrLimit:
+                raise AssemblyError(lineno, line, f"operand {operand} does not fit in {Length.opAddr} bits")
+            word |= (mode << Length.opAddr | addr) << shift
+        # the trailing bits mark superinstructions, see peephole.py
+        return word | extra
+
+    def register(self, lineno, line, num):
+        # R<num> must name a register; its slot is looked up in the machine's operand table at load
+        if f"R{num}" not in self.symbols:
+            raise AssemblyError(lineno, line, f"unknown register R{num}")
+        return num
+
+    def encodeOp(self, lineno, line, operand):
+        """
+        (mode, address) of one operand; same modes and fallbacks as Instruction.encodeOp.
+        """
+        symbols = self.symbols
+        if operand[:1] == "(" and operand[-1:] == ")":
+            operand = operand[1:-1].strip()
+        if operand == "PUSH":
+            return 0b101, 255
+        if operand == "POP":
+            return 0b110, 255
+        first = operand[:1]
+        if first == "@":
+            reg = operand[2:] if operand[1:2] == "R" else operand[1:]
+            if not reg.isdigit():
+                raise AssemblyError(lineno, line, f"invalid register {operand}")
+            return 0b001, self.register(lineno, line, int(reg))
+        if first == "&":
+            target = operand[1:]
+            if target[:1] == "R" and target[1:].isdigit():
+                return 0b001, self.register(lineno, line, int(target[1:]))
+            return 0b010, self.lookup(target)
+        if first == "#":
+            if len(operand) < 2 or not Value.isInteger(operand[1:]):
+                raise AssemblyError(lineno, line, f"invalid immediate {operand}")
+            return 0b011, int(operand[1:])
+        if "[" in operand and operand[-1:] == "]":
+            base, index = operand[:-1].split("[", 1)
+            if index not in indexModes:
+                raise AssemblyError(lineno, line, f"unsupported index register {index}")
+            if base[:1] == "R" and base[1:].isdigit():
+                return indexModes[index], int(base[1:])
+            if base.isdigit():
+                # numeric displacement, e.g. 72[I1]
+                return indexModes[index], int(base)
+            return indexModes[index], self.lookup(base)
+        if first == "R" and operand[1:].isdigit():
+            if int(operand[1:]) == 0:
+                raise AssemblyError(lineno, line, "R0 is not a valid register in this ISA")
+            return 0b001, self.register(lineno, line, int(operand[1:]))
+        if operand in self.labels:
+            # a label is the instruction address itself
+            return 0b011, self.lookup(operand)
+        if operand in symbols:
+            return 0b010, self.lookup(operand)
+        if Value.isInteger(operand):
+            return 0b011, int(operand) & 0xFF
+        self.lookup(operand)
+        return 0b000, 0
+
+    def lookup(self, name):
+        if self.used is not None:
+            self.used.add(name)
+        if name not in self.symbols:
+            self.unresolved = name
+            return 0
+        return self.symbols[name]
+
+
+class IncrementalAssembler(Assembler):
+    """
+    Assembler for repeated runs over an edited source. Encoded words are kept per statement
+    together with the symbols each one looked up; a later assemble() re-encodes only the statements
+    that are new or that use a symbol whose address (or kind) changed, and reuses the rest.
+    """
+    def __init__(self, machine=None):
+        super().__init__(machine)
+        self.initial = dict(self.symbols)
+        self.cache = {}
+        self.reused = 0
+        self.encoded = 0
+
+    def assemble(self, program):
+        self.symbols = dict(self.initial)
+        self.labels = set()
+        self.data = {}
+        self.reused = self.encoded = 0
+        start = time.perf_counter()
+        statements = self.firstPass(program)
+        cache, code = {}, []
+        for lineno, line, op, operands in statements:
+            key = (op, tuple(operands))
+            entry = cache.get(key) or self.cache.get(key)
+            if entry is not None and all(self.signature(name) == signature for name, signature in entry[1]):
+                self.reused += 1
+            else:
+                self.used = set()
+                try:
+                    word = self.encode(lineno, line, op, operands, len(code))
+                finally:
+                    used, self.used = self.used, None
+                entry = (word, tuple((name, self.signature(name)) for name in used))
+                self.encoded += 1
+            cache[key] = entry
+            code.append(entry[0])
+        self.cache = cache
+        self.seconds += time.perf_counter() - start
+        base, data = self.dataImage()
+        return ObjectFile(code, data, base, self.symbols)
+
+    def signature(self, name):
+        # what an operand naming this symbol encodes to depends on both
+        return name in self.labels, self.symbols.get(name)
@@ -0,0 +1,89 @@
+import contextlib
+import csv
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import storage
+from assembler import Assembler
+from run import engine, readProgram
+
+# warm machine and engine of the current worker process, set up once by initWorker
+worker = {}
+
+
+def programFiles(pattern):
+    """
+    Program files for a directory (every .txt in it) or a glob pattern, sorted.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.txt")
+    return sorted(glob.glob(pattern))
+
+
+def initWorker(engine_name="interp", optimize=False):
+    worker["machine"] = storage.Machine()
+    worker["engine"] = engine(engine_name)
+    worker["optimize"] = optimize
+
+
+def runFile(filename):
+    """
+    Runs one program on the worker's machine, reset to its initial state first.
+    Returns the program output, named registers, instruction count and wall time, and the
+    optimizer's instruction counts when the worker optimizes.
+    """
+    if not worker:
+        initWorker()
+    machine = worker["machine"]
+    machine.reset()
+    out = io.StringIO()
+    steps, error, optimizer, registers, prog = None, None, None, {}, None
+    start = time.perf_counter()
+    try:
+        program = readProgram(filename)
+        if worker["optimize"]:
+            assembler = Assembler(machine, optimize=True)
+            program = assembler.assemble(program)
+            optimizer = assembler.optimizer.stats()
+        with contextlib.redirect_stdout(out):
+            prog = worker["engine"](program, machine)
+            steps = prog.run()
+        registers = machine.registers()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        # the worker's machine outlives the engine, which must not leave its store hooks behind
+        if prog is not None:
+            prog.close()
+    elapsed = time.perf_counter() - start
+    return {"program": filename, "instructions": steps, "time": elapsed, "error": error,
+            "output": out.getvalue(), "registers": registers, "optimizer": optimizer}
+
+
+def runBatch(files, engine_name="interp", jobs=None, optimize=False):
+    jobs = jobs or os.cpu_count() or 1
+    # a few chunks per worker keeps the pool balanced without one task per file
+    chunksize = max(1, len(files) // (4 * jobs))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initWorker, initargs=(engine_name, optimize)) as pool:
+        return list(pool.map(runFile, files, chunksize=chunksize))
+
+
+def writeReport(results, filename):
+    """
+    Writes the batch results as JSON, or as CSV with one register per column when filename ends in .csv.
+    """
+    if filename.endswith(".csv"):
+        names = sorted({name for result in results for name in result["registers"]})
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["program", "instructions", "time", "error", "output"] + names)
+            for result in results:
+                writer.writerow([result["program"], result["instructions"], f"{result['time']:.6f}",
+                                 result["error"] or "", result["output"]]
+                                + [result["registers"].get(name, "") for name in names])
+    else:
+        with open(filename, "w") as f:
+            json.dump(results, f, indent=1)
@@ -0,0 +1,191 @@
+"""
+Benchmark suite for the codec, storage, assembler and interpreter.
+
+    python bench.py                         run everything and print ops/s and instructions/s
+    python bench.py --save baseline.json    also save the results as a baseline
+    python bench.py --compare baseline.json compare against a saved baseline
+
+Microbenchmarks time single calls (ops/s); macrobenchmarks run generated programs
+on every engine (instructions/s).
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import compiler
+import storage
+from convert import Precision, Word
+from run import engine
+
+engines = ["interp", "threaded", "block"]
+sizes = [16, 64, 128]
+
+
+def micro(name, func, repeat=3):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat, number)) / number
+    return name, {"ops_per_sec": 1 / best}
+
+
+def microbenchmarks():
+    machine = storage.Machine()
+    paged = storage.Machine(mem_len=2**24, paged=True)
+    legacy = storage.Storage()
+    legacy.setStorage(256)
+    word = Precision.dec2spbin(1234.56)
+    packed = Word.bin2word(word)
+    prog = engine("interp")(["MOV R1 #5"], machine)
+    return dict([
+        micro("Precision.dec2spbin", lambda: Precision.dec2spbin(1234.56)),
+        micro("Precision.spbin2dec", lambda: Precision.spbin2dec(word)),
+        micro("Word.dec2word", lambda: Word.dec2word(1234.56)),
+        micro("Word.word2dec", lambda: Word.word2dec(packed)),
+        micro("Storage.load", lambda: legacy.load(100)),
+        micro("Storage.store", lambda: legacy.store(100, 1234.56)),
+        micro("WordStorage.load", lambda: machine.memory.load(100)),
+        micro("WordStorage.store", lambda: machine.memory.store(100, 1234.56)),
+        micro("PagedStorage.load", lambda: paged.memory.load(10_000_000)),
+        micro("PagedStorage.store", lambda: paged.memory.store(10_000_000, 1234.56)),
+        micro("Instruction.encode", lambda: compiler.Instruction.encode("ADD R1 #5", machine)),
+        micro("Program.getOp register", lambda: prog.getOp("00100000001")),
+        micro("Program.getOp memory", lambda: prog.getOp("01001100100")),
+    ])
+
+
+# generated ISA programs: name -> (source lines, machine setup)
+def arithmeticChain(size):
+    ops = ["ADD R1 R2", "SUB R3 R1", "MUL R2 #1", "ADD R4 #3", "MOV R5 R4", "SUB R5 #1", "DIV R4 #1", "MOD R6 #7"]
+    return ["MOV R1 #1", "MOV R2 #2"] + [ops[i % len(ops)] for i in range(size)] + ["EOP"], None
+
+
+def stackLoop(size):
+    body = ["PUSH R1", "PUSH R2", "POP R3", "POP R4", "ADD R1 #1"]
+    return ["MOV R1 #1", "MOV R2 #2"] + body * (size // len(body) + 1) + ["EOP"], None
+
+
+def arrayWalk(size):
+    # sums memory[base + k] for k < size through the I1 index register; the array sits
+    # past the generated code, which is longer than the 72-111 array region allows
+    base = max(storage.mapr, size + 2)
+    def setup(machine):
+        machine.register.store(machine.variable.load("I1"), base)
+        machine.memory.storeValues(base, range(size))
+    return ["MOV R1 #0"] + [f"ADD R1 {k}[I1]" for k in range(size)] + ["EOP"], setup
+
+
+workloads = {"arithmetic": arithmeticChain, "stack": stackLoop, "array": arrayWalk}
+
+
+def macro(engine_name, lines, setup, min_time=0.2):
+    """
+    Re-runs one loaded program from PC 0 until min_time has passed; returns instructions/s.
+    """
+    machine = storage.Machine()
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        prog = engine(engine_name)(lines, machine)
+    pc_addr = machine.variable.load("PC")
+    tsp_addr = machine.variable.load("TSP")
+    # long generated programs reach into the stack region, so the stack starts past the code
+    stack = max(storage.mspr, len(lines) + 16)
+    machine.register.store(machine.variable.load("SPR"), stack)
+    steps, elapsed = 0, 0.0
+    while elapsed < min_time:
+        machine.register.store(pc_addr, 0)
+        machine.register.store(tsp_addr, stack)
+        if setup:
+            setup(machine)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(out):
+            steps += prog.run()
+        elapsed += time.perf_counter() - start
+    return {"instructions_per_sec": steps / elapsed}
+
+
+def macrobenchmarks(names=None):
+    results = {}
+    for workload, build in workloads.items():
+        for size in sizes:
+            lines, setup = build(size)
+            for engine_name in engines:
+                name = f"{workload}[{size}] {engine_name}"
+                if names and not any(part in name for part in names):
+                    continue
+                results[name] = macro(engine_name, lines, setup)
+    return results
+
+
+def coldStart(command, runs):
+    best = None
+    for i in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"seconds": best}
+
+
+def startup(runs=5):
+    """
+    Cold run.py latency in fresh interpreters: the bare interpreter, importing run,
+    and assembling and running testprog.txt.
+    """
+    return {"startup python": coldStart(["-c", "pass"], runs),
+            "startup import": coldStart(["-c", "import run"], runs),
+            "startup": coldStart(["run.py", "testprog.txt", "--no-cache"], runs)}
+
+
+def rate(result):
+    # the one number each benchmark is compared on; higher is better
+    if "seconds" in result:
+        return 1 / result["seconds"]
+    return result.get("ops_per_sec") or result.get("instructions_per_sec")
+
+
+def report(results, baseline=None, threshold=0.1):
+    regressions = 0
+    for name, result in results.items():
+        unit, value = next(iter(result.items()))
+        line = f"{name:<34}{value:>16,.6g} {unit}"
+        if baseline and name in baseline:
+            change = rate(result) / rate(baseline[name]) - 1
+            flag = ""
+            if change < -threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            line += f"  {change:+7.1%}{flag}"
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ISA simulator")
+    parser.add_argument("--save", metavar="FILE", help="save results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown reported as regression (default 0.1)")
+    parser.add_argument("--only", choices=["micro", "macro", "startup"], help="run one group only")
+    parser.add_argument("--filter", nargs="*", help="macrobenchmarks whose name contains any of these")
+    args = parser.parse_args()
+    results = {}
+    if args.only in (None, "micro"):
+        results.update(microbenchmarks())
+    if args.only in (None, "macro"):
+        results.update(macrobenchmarks(args.filter))
+    if args.only in (None, "startup"):
+        results.update(startup())
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    regressions = report(results, baseline, args.threshold)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=1)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,207 @@
+from convert import Word
+from decode import DecodeCache, Op
+from run import Program
+from threaded import ThreadedProgram
+
+# opcodes that end a basic block; they still run through the threaded handlers
+terminators = {Op.JEQ, Op.JNE, Op.JLT, Op.JLE, Op.JGT, Op.JGE, Op.JMP, Op.CALL, Op.RET, Op.EOP}
+constants = (0b000, 0b011)     # operand modes whose address field is the value itself
+arithmetic = {"ADD": "{} + {}", "SUB": "{} - {}", "MUL": "{} * {}", "DIV": "div({}, {})", "MOD": "mod({}, {})"}
+
+# compiled block factories keyed by their generated source
+compiled = {}
+
+
+class Blocks(dict):
+    """
+    Compiled basic blocks keyed by their start address, compiled on first use.
+    None marks an address where no block of two or more instructions starts.
+    A store anywhere in the scanned range of a block drops it.
+    """
+    def __init__(self, program):
+        super().__init__()
+        self.program = program
+        self.covering = {}
+        program.machine.memory.hooks.append(self.invalidate)
+
+    def __missing__(self, start):
+        block, end = self.program.compileBlock(start)
+        self[start] = block
+        for address in range(start, end + 1):
+            self.covering.setdefault(address, set()).add(start)
+        return block
+
+    def close(self):
+        hooks = self.program.machine.memory.hooks
+        if self.invalidate in hooks:
+            hooks.remove(self.invalidate)
+
+    def invalidate(self, address):
+        if address is None:
+            self.clear()
+            self.covering.clear()
+            return
+        for start in self.covering.pop(address, ()):
+            self.pop(start, None)
+
+
+class BlockProgram(ThreadedProgram):
+    """
+    Basic-block engine.
+    Straight-line runs of MOV, PRNT and arithmetic are translated to one Python function
+    per block that keeps registers in locals and writes them back when the block exits.
+    Everything else, including the block terminators, runs on the threaded handlers.
+    """
+    def __init__(self, program, machine=None):
+        super().__init__(program, machine)
+        self.blocks = Blocks(self)
+
+    def close(self):
+        super().close()
+        self.blocks.close()
+
+    def run(self, resume=False):
+        self.attached()
+        if self.observed():
+            # traced and profiled runs go through the reference interpreter, which reports every step
+            return Program.run(self, resume)
+        pc_addr = self.machine.slots['PC']
+        ir_addr = self.machine.slots['IR']
+        handlers = self.handlers
+        blocks = self.blocks
+        pc = ir = int(self.machine.register.load(pc_addr, isCode=False))
+        if resume:
+            ir = int(self.machine.register.load(ir_addr, isCode=False))
+        steps = 0
+        try:
+            while True:
+                # blocks only run sequentially; the first fetch re-executes PC
+                if pc == ir + 1:
+                    block = blocks[ir]
+                    if block is not None:
+                        count = block()
+                        steps += count
+                        ir += count
+                        pc = ir + 1
+                        continue
+                stop = handlers[ir]()
+                if stop is not None:
+                    steps += stop
+                    break
+                steps += 1
+                ir, pc = pc, pc + 1
+        finally:
+            self.machine.register.store(ir_addr, ir)
+            self.machine.register.store(pc_addr, pc)
+            self.output.flush()
+        return steps
+
+    def compileBlock(self, start):
+        """
+        Returns the block function starting at start (or None) and the last address scanned.
+        """
+        cache = DecodeCache.of(self.machine.memory)
+        body = []
+        address = start
+        while True:
+            instruction = cache.fetch(address)
+            if instruction is None or instruction.op in terminators:
+                break
+            lines = self.translateBlock(instruction)
+            if lines is None:
+                break
+            body.append(lines)
+            address += 1
+        if len(body) < 2:
+            return None, address
+        return self.buildBlock(start, body), address
+
+    def translateBlock(self, instruction):
+        """
+        (registers read, destination register, code lines) for one instruction,
+        or None if it cannot join a block. Registers live in locals r<addr> (value) and w<addr> (word).
+        """
+        operation = instruction.name
+        if operation not in arithmetic and operation not in ["MOV", "PRNT"]:
+            return None
+        op1 = self.blockOperand(instruction.mode1, instruction.addr1)
+        op2 = self.blockOperand(instruction.mode2, instruction.addr2)
+        if op1 is None or op2 is None:
+            return None
+        reads = op1[0] | op2[0]
+        if operation == "PRNT":
+            return reads, None, [f"emit(f\"Printing: {{{op1[1]}}}\")"]
+        dest = self.blockRegister(instruction.extra or instruction.addr1)
+        if dest is None:
+            return None
+        if operation == "MOV":
+            if instruction.mode2 in constants:
+                # constant move, encode at compile time; a memload() operand reads no register but is no constant
+                word = Word.dec2word(int(op2[1]))
+                return reads, dest, [f"w{dest} = {word}", f"r{dest} = {Word.word2dec(word)!r}"]
+            value = op2[1]
+        else:
+            value = arithmetic[operation].format(op1[1], op2[1])
+        return reads, dest, [f"w{dest} = enc({value})", f"r{dest} = dec(w{dest})"]
+
+    def blockRegister(self, num):
+        return self.machine.operands[num]
+
+    def blockOperand(self, mode, addr):
+        """
+        (registers read, expression) for one operand, or None if the mode cannot be compiled.
+        """
+        if mode in constants:
+            return set(), str(addr)
+        if mode == 0b001:
+            reg = self.blockRegister(addr)
+            if reg is None:
+                return None
+            return {reg}, f"r{reg}"
+        if mode == 0b010:
+            return set(), f"memload({addr})"
+        if mode == 0b100:
+            index = self.machine.slots.get('I1')
+            if index is None:
+                return None
+            return {index}, f"memload(r{index} + {addr})"
+        return None
+
+    def buildBlock(self, start, body):
+        loaded, written, code = set(), [], []
+        for reads, dest, lines in body:
+            # registers read before the block writes them are loaded on entry
+            loaded |= {reg for reg in reads if reg not in written}
+            if dest is not None and dest not in written:
+                written.append(dest)
+            code.extend(lines)
+        source = ["def make(regload, regstore, memload, enc, dec, div, mod, emit):",
+                  "    def block():"]
+        source += [f"        r{reg} = regload({reg})" for reg in sorted(loaded)]
+        source += [f"        w{reg} = None" for reg in written]
+        source += ["        try:"]
+        source += [f"            {line}" for line in code]
+        source += ["        finally:"]
+        source += [f"            if w{reg} is not None: regstore({reg}, w{reg})" for reg in written] or ["            pass"]
+        source += [f"        return {len(body)}", "    return block"]
+        source = "\n".join(source)
+
+        make = compiled.get(source)
+        if make is None:
+            namespace = {}
+            exec(compile(source, f"<block {start}>", "exec"), namespace)
+            make = compiled[source] = namespace["make"]
+        return make(self.machine.register.load, self.machine.register.storeWord, self.machine.memory.load,
+                    Word.dec2word, Word.word2dec, self.divide, self.modulo, self.emit)
+
+    def divide(self, op1, op2):
+        if op2 == 0:
+            self.emit(self.exception("DivisionByZero", 0).message)
+            return 0
+        return op1 // op2
+
+    def modulo(self, op1, op2):
+        if op2 == 0:
+            self.emit(self.exception("DivisionByZero", 0).message)
+            return 0
+        return op1 % op2
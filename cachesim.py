@@ -0,0 +1,162 @@
+"""
+Cache simulator for the reference interpreter: separate instruction and data caches between the
+run loop and memory, observed like the profiler.
+
+    program.caches = CacheModel(Cache(64, 4, 2), Cache(128, 8, 4, "fifo"))
+
+Sizes and lines are in words. Every executed instruction is one instruction-cache access at its
+address. Every memory load or store during an instruction is one data-cache access (write-allocate)
+and is counted under the addressing mode that caused it: direct (010) and indexed (100) operands,
+and the stack for PUSH and POP. Misses are split into compulsory, capacity and conflict misses
+against a fully associative LRU cache of the same size.
+"""
+import json
+import random
+from collections import Counter, OrderedDict
+
+modeNames = {0b010: "direct", 0b100: "indexed"}
+policies = ("lru", "fifo", "random")
+
+
+class Cache:
+    def __init__(self, size=64, line=4, ways=2, policy="lru", seed=0):
+        if policy not in policies:
+            raise ValueError(f"unknown replacement policy {policy!r}, use one of {', '.join(policies)}")
+        if size <= 0 or line <= 0 or ways <= 0 or size % (line * ways):
+            raise ValueError("cache size must be a positive multiple of line * ways")
+        self.size = size
+        self.line = line
+        self.ways = ways
+        self.policy = policy
+        self.sets = [OrderedDict() for _ in range(size // (line * ways))]
+        self.random = random.Random(seed)
+        self.shadow = OrderedDict()     # fully associative LRU of the same capacity, for the 3C split
+        self.seen = set()
+        self.hits = Counter()
+        self.misses = Counter()         # (kind, miss kind) -> count
+
+    def access(self, address, kind="fetch"):
+        """
+        Looks up one word; returns True on a hit and fills the line on a miss.
+        """
+        tag = address // self.line
+        lines = self.sets[tag % len(self.sets)]
+        hit = tag in lines
+        if hit:
+            if self.policy == "lru":
+                lines.move_to_end(tag)
+            self.hits[kind] += 1
+        else:
+            self.misses[kind, self.classify(tag)] += 1
+            if len(lines) >= self.ways:
+                if self.policy == "random":
+                    del lines[self.random.choice(list(lines))]
+                else:
+                    # lru keeps the least recent line first, fifo the oldest fill
+                    lines.popitem(last=False)
+            lines[tag] = True
+        shadow = self.shadow
+        if tag in shadow:
+            shadow.move_to_end(tag)
+        else:
+            if len(shadow) >= self.size // self.line:
+                shadow.popitem(last=False)
+            shadow[tag] = True
+        self.seen.add(tag)
+        return hit
+
+    def classify(self, tag):
+        if tag not in self.seen:
+            return "compulsory"
+        return "conflict" if tag in self.shadow else "capacity"
+
+    def report(self):
+        kinds = sorted(set(self.hits) | {kind for kind, miss in self.misses})
+        def summary(hits, misses):
+            accesses = hits + sum(misses.values())
+            return {"accesses": accesses, "hits": hits, "hit_rate": hits / accesses if accesses else 0.0,
+                    "misses": misses}
+        total = Counter()
+        for (kind, miss), count in self.misses.items():
+            total[miss] += count
+        return dict({"size": self.size, "line": self.line, "ways": self.ways, "policy": self.policy},
+                    **summary(sum(self.hits.values()), dict(total)),
+                    modes={kind: summary(self.hits[kind], {miss: count for (k, miss), count in self.misses.items()
+                                                           if k == kind})
+                           for kind in kinds})
+
+
+class CacheModel:
+    """
+    Instruction and data caches of one run; either may be None.
+    """
+    def __init__(self, icache=None, dcache=None):
+        self.icache = icache
+        self.dcache = dcache
+        self.pending = []
+        self.patched = []
+
+    @staticmethod
+    def fromConfig(config):
+        # parsed {"icache": {"size": 64, "line": 4, "ways": 2, "policy": "lru"}, "dcache": {...}}; null drops one
+        return CacheModel(*(Cache(**config[name]) if config.get(name) is not None else None
+                            for name in ("icache", "dcache")))
+
+    def attach(self, machine):
+        if self.dcache is None:
+            return
+        memory = machine.memory
+        pending = self.pending
+        for method in ("load", "store"):
+            original = getattr(memory, method)
+            def accessed(address, *args, original=original, **kwargs):
+                pending.append(address)
+                return original(address, *args, **kwargs)
+            # a method patched by another observer (the profiler) is put back on detach
+            self.patched.append((memory, method, vars(memory).get(method)))
+            setattr(memory, method, accessed)
+
+    def detach(self):
+        for memory, method, previous in reversed(self.patched):
+            if previous is None:
+                delattr(memory, method)
+            else:
+                setattr(memory, method, previous)
+        self.patched = []
+
+    def step(self, pc, instruction):
+        if self.icache is not None:
+            self.icache.access(pc)
+        if not self.pending:
+            return
+        # the interpreter fetches operand 1, then operand 2, then PUSH/POP touch the stack
+        kinds = [modeNames[mode] for mode in (instruction.mode1, instruction.mode2) if mode in modeNames]
+        for i, address in enumerate(self.pending):
+            self.dcache.access(int(address), kinds[i] if i < len(kinds) else "stack")
+        self.pending.clear()
+
+    def report(self):
+        return {name: cache.report() for name, cache in (("icache", self.icache), ("dcache", self.dcache))
+                if cache is not None}
+
+    def table(self):
+        lines = []
+        for name, report in self.report().items():
+            lines += [f"{name}: {report['size']} words, {report['line']}-word lines, {report['ways']}-way "
+                      f"{report['policy']}",
+                      f"{'mode':<12}{'accesses':>10}{'hit rate':>10}{'compulsory':>12}{'capacity':>10}{'conflict':>10}"]
+            rows = list(report["modes"].items()) + [("total", report)]
+            for mode, row in rows:
+                misses = row["misses"]
+                lines.append(f"{mode:<12}{row['accesses']:>10}{row['hit_rate']:>10.1%}"
+                             f"{misses.get('compulsory', 0):>12}{misses.get('capacity', 0):>10}"
+                             f"{misses.get('conflict', 0):>10}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def dump(self, filename):
+        with open(filename, "w") as f:
+            if filename.endswith(".json"):
+                json.dump(self.report(), f, indent=1)
+            else:
+                f.write(self.table())
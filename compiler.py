@@ -1,4 +1,5 @@
 import storage
+import tracing
 from addressing import Access, AddressingMode
 from convert import Length, Precision, Value
 
@@ -34,7 +35,7 @@ class Instruction:
         return [" ".join(new_parts)]
 
     @staticmethod
-    def encode(inst):
+    def encode(inst, machine=None):
         parts = inst.strip().split()
         if not parts:
             return "0" * Length.instrxn  # empty fallback
@@ -51,17 +52,16 @@ class Instruction:
                 found = True
                 break
         if not found:
-            print(f"DEBUG: op={op}, parts={parts}, inst={inst}") 
             raise Exception(f"Unknown operation: {op}")         
 
         op1Mode, op2Mode = "000", "000"
         op1Addr, op2Addr = "00000000", "00000000"
 
         if len(parts) == 2:
-            op1Mode, op1Addr = Instruction.encodeOp(parts[1])
+            op1Mode, op1Addr = Instruction.encodeOp(parts[1], machine)
         elif len(parts) == 3:
-            op1Mode, op1Addr = Instruction.encodeOp(parts[1])
-            op2Mode, op2Addr = Instruction.encodeOp(parts[2])
+            op1Mode, op1Addr = Instruction.encodeOp(parts[1], machine)
+            op2Mode, op2Addr = Instruction.encodeOp(parts[2], machine)
 
         bin_str = opcode + op1Mode + op1Addr + op2Mode + op2Addr + "0" * 5
 
@@ -71,8 +71,10 @@ class Instruction:
         return bin_str
 
     @staticmethod
-    def encodeOp(operand):
-        print(f"Encoding operand: '{operand}'")
+    def encodeOp(operand, machine=None):
+        machine = machine or storage.machine
+        if tracing.tracer is not None:
+            tracing.tracer.emit(tracing.DEBUG, "encode", operands=(operand,))
         # Handle indirect (@), direct (&), immediate (#), indexed, register, symbolic, stack, etc.
 
         if operand.startswith("(") and operand.endswith(")"):
@@ -105,7 +107,7 @@ class Instruction:
                 # symbolic variable or label
                 mode = "010"
                 try:
-                    addr_num = int(storage.variable.load(target))
+                    addr_num = Instruction.address(target, machine)
                 except Exception:
                     addr_num = 0
                 addr = format(addr_num, '08b')
@@ -127,7 +129,7 @@ class Instruction:
                 reg_num = int(base[1:])
             else:
                 try:
-                    reg_num = int(storage.variable.load(base))
+                    reg_num = Instruction.address(base, machine)
                 except:
                     reg_num = 0
             addr = format(reg_num, '08b')
@@ -143,7 +145,7 @@ class Instruction:
                 reg_num = int(base[1:])
             else:
                 try:
-                    reg_num = int(storage.variable.load(base))
+                    reg_num = Instruction.address(base, machine)
                 except:
                     reg_num = 0
             addr = format(reg_num, '08b')
@@ -159,7 +161,7 @@ class Instruction:
 
         # Symbolic variable or label
         try:
-            addr_num = int(storage.variable.load(operand))
+            addr_num = Instruction.address(operand, machine)
             mode = "010"  # direct memory
             addr = format(addr_num, '08b')
             return mode, addr
@@ -175,9 +177,22 @@ class Instruction:
                 return "000", "00000000"
 
     @staticmethod
-    def encodeProgram(program):
-        program = Instruction.preEncode(program)
-        pc = int(storage.register.load("PC"))
-        for i, inst in enumerate(program):
-            bin_inst = Instruction.encode(inst)
-            storage.memory.store(pc + i, bin_inst)
+    def address(name, machine):
+        # labels and DEF names of the loaded program first, then the register names
+        if name in machine.symbols:
+            return machine.symbols[name]
+        return int(machine.variable.load(name))
+
+    @staticmethod
+    def assemble(program, machine=None):
+        # source lines to 32-bit instruction strings, expanding pre-encoded pairs
+        return [Instruction.encode(inst, machine)
+                for instruction in program
+                for inst in Instruction.preEncode(instruction)]
+
+    @staticmethod
+    def encodeProgram(program, machine=None):
+        machine = machine or storage.machine
+        pc = int(machine.register.load(machine.variable.load("PC")))
+        for i, bin_inst in enumerate(Instruction.assemble(program, machine)):
+            machine.memory.store(pc + i, bin_inst)
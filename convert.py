@@ -1,4 +1,9 @@
-import math
+import struct
+from array import array
+try:
+	import numpy as np
+except ImportError:
+	np = None
 
 class Length:
 	whole = 8
@@ -44,26 +49,12 @@ class BinaryFraction:
 		return int(ibin[istart+1:], 2) / 2.**(len(ibin))
 
 class Precision:
+	# string views of the Word codec, e.g. "0"+"10000010"+"0100..." for 10.0
 	@staticmethod
 	def spbin2dec(binum,binlen=Length.whole):
-		de = 2**(binlen-1)-1
-		s = int(binum[0])
-		e = int(binum[1:binlen+1],2)
-		f = BinaryFraction.ibin2dec(binum[binlen+1:])
-		return Length.trimDec((-1)**s*2**(e-de)*(1+f))
+		return Word.word2dec(int(binum,2),binlen)
 	def dec2spbin(decnum,binlen=Length.whole):
-		if decnum==0:
-			return "0"+"0"*binlen+"0"*(Length.fraction)
-		de = 2**(binlen-1)-1
-		s = 0
-		if decnum<0:
-			s = 1
-		p = int(math.log2(abs(decnum)))
-		e = str(bin(p+de))[2:]
-		lead = "0"*(binlen-len(e))
-		e = lead+e
-		f = BinaryFraction.idec2bin(abs(decnum)/(2**p)-1)
-		return str(s)+str(e)+str(f)
+		return Word.word2bin(Word.dec2word(decnum,binlen))
 	def spbin2bin(bin_str,binlen):
 		result = Precision.spbin2dec(bin_str)
 		result = Length.addZeros(result,binlen)
@@ -73,36 +64,98 @@ class Precision:
 		result = Precision.dec2spbin(result)
 		return result
 
-find_fake = False
-if find_fake:
-	fake_cntr = 0
-	dec = 2
-	max_e = 16
-	max_num = 2**max_e
-	too_much_fake = max_num
-	total_num = max_num*10**dec
-	print_cmp = True
-	print_errors = True
-	print_innerrors = False
-	round_fake = False
-	for i in range(max_num):
-		for j in range(10**dec):
-			k = round(i+j*1.0/(10**dec),dec)
-			fake_k = Precision.spbin2dec(Precision.dec2spbin(k))
-			if round_fake:
-				fake_k = round(fake_k,dec)
-			if k!=fake_k:
-				if print_cmp:
-					print(f"{k} {fake_k}")
-				fake_cntr += 1
-		if too_much_fake<=fake_cntr:
-			break
-		if print_innerrors:
-			fake_pcnt = fake_cntr/total_num
-			print(f"From 0 to {max_num}, for {dec} decimal places:")
-			print(str(fake_cntr)+" errors out of "+str(total_num)+" ("+str(round(fake_pcnt*100,int(max_e/5)))+"%)")
-	if print_errors:
-		fake_pcnt = fake_cntr/total_num
-		print(f"From 0 to {max_num}, for {dec} decimal places:")
-		print(str(fake_cntr)+" errors out of "+str(total_num)+" ("+str(round(fake_pcnt*100,int(max_e/5)))+"%)")
+double = struct.Struct("<d")
+doubleBits = struct.Struct("<Q")
+
+def layout(binlen):
+	# fraction length, exponent mask, fraction mask and exponent bias for a binlen-bit exponent
+	flen = Length.precision-binlen-1
+	return flen, (1<<binlen)-1, (1<<flen)-1, (1<<(binlen-1))-1
+
+layouts = {binlen: layout(binlen) for binlen in range(1,Length.precision-1)}
+
+class Word:
+	# packed 32-bit words: sign | exponent | fraction, moved with shifts and masks over the
+	# IEEE double bits of the value; the fraction is truncated and decoding rounds to dec_place
+	@staticmethod
+	def fields(word,binlen=Length.whole):
+		flen, emask, fmask, bias = layouts[binlen]
+		return word>>(Length.precision-1), word>>flen & emask, word & fmask
+	def pack(s,e,f,binlen=Length.whole):
+		flen = layouts[binlen][0]
+		return s<<(Length.precision-1) | e<<flen | f
+	def dec2word(decnum,binlen=Length.whole):
+		if decnum==0:
+			return 0
+		flen, emask, fmask, bias = layouts[binlen]
+		bits = doubleBits.unpack(double.pack(decnum))[0]
+		e = (bits>>52 & 0x7FF)-1023+bias
+		if e<0 or e>emask:
+			raise OverflowError(f"{decnum} is out of range for {Length.precision}-bit precision")
+		return (bits>>63)<<(Length.precision-1) | e<<flen | (bits & 0xFFFFFFFFFFFFF)>>(52-flen)
+	def word2dec(word,binlen=Length.whole):
+		flen, emask, fmask, bias = layouts[binlen]
+		# the value is m*2**k exactly; round it to dec_place digits, half to even
+		m = word & fmask | fmask+1
+		k = (word>>flen & emask)-bias-flen
+		if k>=0:
+			value = float(m<<k)
+		else:
+			n = m*decScale
+			q = n>>-k
+			r = n-(q<<-k)
+			half = 1<<(-k-1)
+			if r>half or r==half and q&1:
+				q += 1
+			value = q/decScale
+		return -value if word>>(Length.precision-1) else value
+	def bin2word(bin_str):
+		return int(bin_str,2)
+	def word2bin(word,binlen=Length.precision):
+		return format(word,"0"+str(binlen)+"b")
 
+decScale = 10**Length.dec_place
+
+class Words:
+	# whole arrays of the Word codec in one call; NumPy when installed, Word per value otherwise.
+	# Results are exactly those of Word.dec2word/word2dec/word2bin.
+	@staticmethod
+	def dec2words(values,binlen=Length.whole):
+		if np is None:
+			return array('I',[Word.dec2word(value,binlen) for value in values])
+		flen, emask, fmask, bias = layouts[binlen]
+		values = np.asarray(values,dtype=np.float64)
+		bits = values.view(np.uint64)
+		e = (bits>>np.uint64(52) & np.uint64(0x7FF)).astype(np.int64)-1023+bias
+		nonzero = values!=0
+		if np.any(nonzero & ((e<0) | (e>emask))):
+			bad = values[nonzero & ((e<0) | (e>emask))][0]
+			raise OverflowError(f"{bad} is out of range for {Length.precision}-bit precision")
+		words = (bits>>np.uint64(63))<<np.uint64(Length.precision-1) \
+			| (e.astype(np.uint64) & np.uint64(emask))<<np.uint64(flen) \
+			| (bits & np.uint64(0xFFFFFFFFFFFFF))>>np.uint64(52-flen)
+		return np.where(nonzero,words,0).astype(np.uint32)
+	def words2dec(words,binlen=Length.whole):
+		if np is None:
+			return [Word.word2dec(word,binlen) for word in words]
+		flen, emask, fmask, bias = layouts[binlen]
+		words = np.asarray(words,dtype=np.int64)
+		m = words & fmask | fmask+1
+		k = (words>>flen & emask)-bias-flen
+		# k<0: round m*decScale/2**-k half to even; past 40 bits the quotient is always 0
+		shift = np.clip(-k,1,40)
+		n = m*decScale
+		q = n>>shift
+		r = n-(q<<shift)
+		half = np.int64(1)<<(shift-1)
+		q += (r>half) | ((r==half) & (q&1==1))
+		value = np.where(k>=0,np.ldexp(m.astype(np.float64),np.maximum(k,0)),q/decScale)
+		return np.where(words>>(Length.precision-1) & 1,-value,value)
+	def words2bin(words,binlen=Length.precision):
+		if np is None:
+			return [Word.word2bin(word,binlen) for word in words]
+		# one row of bit characters per word, read back as fixed-width strings
+		words = np.asarray(words,dtype=np.uint32).astype(">u4")
+		bits = np.unpackbits(words.view(np.uint8).reshape(-1,4),axis=1)[:,32-binlen:]
+		chars = (bits+ord("0")).astype(np.uint8)
+		return np.ascontiguousarray(chars).view(f"S{binlen}").ravel().astype(str).tolist()
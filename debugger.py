@@ -0,0 +1,242 @@
+"""
+Debugger for a loaded Program: PC breakpoints, register and memory watchpoints, single-step
+and run-to-cursor.
+
+    debugger = Debugger(program)
+    debugger.breakAt(4)
+    debugger.watchRegister("R2")
+    debugger.cont()         # "breakpoint", "watchpoint", "step", "cursor" or "halt"
+    debugger.step()
+    debugger.runTo(9)
+
+A stop always falls between two instructions; debugger.pc is the next one to execute.
+Watchpoints are Storage hooks on the watched addresses and report after the storing instruction.
+With no breakpoints, watchpoints or cursor, cont() hands the rest of the run to the program's
+own engine, so it runs at full speed without per-instruction checks.
+"""
+
+
+class Debugger:
+    def __init__(self, program):
+        self.program = program
+        self.machine = program.machine
+        self.breakpoints = set()
+        self.watched = {"register": {}, "memory": {}}   # address -> [name, last value]
+        self.hooks = {}
+        self.hits = []      # (pc, space, name, old, new) of every watchpoint hit
+        self.hit = None     # the hit that stops the run at the next instruction
+        self.cursor = None
+        self.budget = None
+        self.resuming = False
+        self.execution = None
+        self.pc = None
+        self.reason = None
+        self.steps = 0
+        self.finished = False
+
+    def breakAt(self, pc):
+        self.breakpoints.add(pc)
+
+    def clear(self, pc=None):
+        # one breakpoint, or all of them
+        if pc is None:
+            self.breakpoints.clear()
+        else:
+            self.breakpoints.discard(pc)
+
+    def watchRegister(self, name):
+        self.watch("register", self.machine.slots[name], name)
+
+    def watchMemory(self, address):
+        # a memory address or a label
+        name = address
+        if type(address) == type(str()):
+            address = self.machine.symbols[address]
+        self.watch("memory", address, name)
+
+    def watch(self, space, address, name):
+        storage = getattr(self.machine, space)
+        watched = self.watched[space]
+        watched[address] = [name, self.value(storage, address)]
+        if space not in self.hooks:
+            def hook(address):
+                if address is None:
+                    # a reset: the watched cells start over from the image
+                    for address, entry in watched.items():
+                        entry[1] = self.value(storage, address)
+                elif address in watched:
+                    self.touched(space, storage, address)
+            self.hooks[space] = hook
+            storage.hooks.append(hook)
+
+    def unwatch(self, space, address):
+        watched = self.watched[space]
+        watched.pop(address, None)
+        if not watched and space in self.hooks:
+            getattr(self.machine, space).hooks.remove(self.hooks.pop(space))
+
+    @staticmethod
+    def value(storage, address):
+        try:
+            return storage.load(address)
+        except (KeyError, IndexError):
+            return None
+
+    def touched(self, space, storage, address):
+        entry = self.watched[space][address]
+        new = self.value(storage, address)
+        if new != entry[1]:
+            hit = (self.current, space, entry[0], entry[1], new)
+            entry[1] = new
+            self.hits.append(hit)
+            self.hit = hit
+
+    @property
+    def current(self):
+        # address of the executing instruction
+        return int(self.machine.register.load(self.machine.slots['IR']))
+
+    def stop(self, pc):
+        """
+        Called by the interpreter before the instruction at pc; True stops the run there.
+        """
+        if self.resuming:
+            # the instruction the run stopped at goes ahead once
+            self.resuming = False
+        else:
+            reason = None
+            if self.hit is not None:
+                reason = "watchpoint"
+            elif pc in self.breakpoints:
+                reason = "breakpoint"
+            elif pc == self.cursor:
+                reason = "cursor"
+            elif self.budget == 0:
+                reason = "step"
+            if reason is not None:
+                self.pc, self.reason = pc, reason
+                return True
+        if self.budget is not None:
+            self.budget -= 1
+        self.steps += 1
+        return False
+
+    def cont(self):
+        """
+        Runs until a breakpoint, a watchpoint hit, the cursor, the end of the step budget or the
+        end of the program; returns the reason.
+        """
+        if self.finished:
+            return self.reason
+        self.hit = None
+        if not (self.breakpoints or self.watched["register"] or self.watched["memory"]
+                or self.cursor is not None or self.budget is not None):
+            return self.finish()
+        program = self.program
+        try:
+            if self.execution is None:
+                program.debugger = self
+                self.execution = program.execution()
+                request = next(self.execution)
+            else:
+                self.resuming = True
+                request = self.execution.send(None)
+            while request != "BREAK":
+                request = self.execution.send(program.input.readline() if request == "SCAN" else None)
+        except StopIteration:
+            self.done()
+        return self.reason
+
+    def finish(self):
+        # nothing left to check: the engine runs the rest from where the debugger stopped
+        resume = self.execution is not None
+        if resume:
+            self.execution.close()
+        # detached first, so the engine takes its fast path and does not stop here again
+        self.program.debugger = None
+        self.steps += self.program.run(resume=resume)
+        self.done()
+        return self.reason
+
+    def done(self):
+        self.program.debugger = None
+        self.execution = None
+        self.finished = True
+        self.pc = None
+        self.reason = "halt"
+
+    def step(self, count=1):
+        self.budget = count
+        try:
+            return self.cont()
+        finally:
+            self.budget = None
+
+    def runTo(self, pc):
+        self.cursor = pc
+        try:
+            return self.cont()
+        finally:
+            self.cursor = None
+
+    def where(self):
+        if self.finished:
+            return f"halted after {self.steps} instructions"
+        if self.pc is None:
+            return "not started"
+        instruction = self.program.cache.fetch(self.pc)
+        text = f"{self.reason} at {self.pc}: {instruction.name if instruction else 'halt'}"
+        if self.reason == "watchpoint":
+            pc, space, name, old, new = self.hits[-1]
+            text += f" ({space} {name}: {old} -> {new} at {pc})"
+        return text
+
+
+commands = """\
+b PC        break at PC             d [PC]      delete a breakpoint, or all
+w NAME      watch a register        m ADDR      watch a memory address or label
+s [N]       step N instructions     u PC        run to PC
+c           continue                r           show registers
+q           quit"""
+
+
+def repl(debugger, read=input):
+    """
+    Line-oriented front end for run.py --debug.
+    """
+    print(commands)
+    while not debugger.finished:
+        try:
+            words = read("(isa) ").split()
+        except EOFError:
+            break
+        if not words:
+            continue
+        command, args = words[0], words[1:]
+        try:
+            if command == "b":
+                debugger.breakAt(int(args[0]))
+            elif command == "d":
+                debugger.clear(int(args[0]) if args else None)
+            elif command == "w":
+                debugger.watchRegister(args[0])
+            elif command == "m":
+                debugger.watchMemory(int(args[0]) if args[0].isdigit() else args[0])
+            elif command == "s":
+                debugger.step(int(args[0]) if args else 1)
+            elif command == "u":
+                debugger.runTo(int(args[0]))
+            elif command == "c":
+                debugger.cont()
+            elif command == "r":
+                print(debugger.machine.registers())
+                continue
+            elif command == "q":
+                break
+            else:
+                print(commands)
+                continue
+        except (IndexError, KeyError, ValueError) as e:
+            print(f"error: {e!r}")
+            continue
+        print(debugger.where())
@@ -0,0 +1,71 @@
+from collections import namedtuple
+from enum import IntEnum
+from compiler import operations, operationCodes
+from convert import Length
+
+# 5-bit opcodes built from the same tables the compiler encodes with
+Op = IntEnum("Op", {op: int(operationCodes[0][i] + operationCodes[1][j], 2)
+                    for i, group in enumerate(operations)
+                    for j, op in enumerate(group)})
+
+# Decoded instruction word: integer fields, opcode enum and its mnemonic
+Decoded = namedtuple("Decoded", ["code", "op", "name", "mode1", "addr1", "mode2", "addr2", "extra"])
+
+opShift = Length.instrxn - 5
+mode1Shift = opShift - Length.opMode
+addr1Shift = mode1Shift - Length.opAddr
+mode2Shift = addr1Shift - Length.opMode
+addr2Shift = mode2Shift - Length.opAddr
+modeMask = 2**Length.opMode - 1
+addrMask = 2**Length.opAddr - 1
+extraMask = 2**addr2Shift - 1
+
+
+def decode(word):
+    """
+    Splits a 32-bit instruction word into its fields.
+    Returns None for the all-zero word, which halts the program.
+    """
+    if not word:
+        return None
+    code = word >> opShift
+    op = Op._value2member_map_.get(code)
+    return Decoded(code, op, op.name if op is not None else "UNKNOWN",
+                   word >> mode1Shift & modeMask, word >> addr1Shift & addrMask,
+                   word >> mode2Shift & modeMask, word >> addr2Shift & addrMask,
+                   word & extraMask)
+
+
+class DecodeCache:
+    """
+    Decoded instructions keyed by memory address.
+    Any store into a cached address drops its entry, so self-modifying code is re-decoded.
+    """
+    def __init__(self, memory):
+        self.memory = memory
+        self.entries = {}
+        memory.hooks.append(self.invalidate)
+
+    @staticmethod
+    def of(memory):
+        # one cache per memory, shared by every program loaded into it
+        cache = getattr(memory, "decodeCache", None)
+        if cache is None:
+            cache = memory.decodeCache = DecodeCache(memory)
+        return cache
+
+    def fetch(self, address):
+        try:
+            return self.entries[address]
+        except KeyError:
+            entry = self.entries[address] = decode(self.memory.loadWord(address))
+            return entry
+
+    def invalidate(self, address):
+        if address is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(address, None)
+
+    def clear(self):
+        self.entries.clear()
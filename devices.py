@@ -0,0 +1,95 @@
+"""
+I/O devices of a Program: PRNT writes its text to program.output, SCAN reads one value per
+line from program.input.
+
+    Console         output straight to sys.stdout, like print (the default)
+    BufferedOutput  output collected and written in bulk when full, on flush() and after each run
+    StreamOutput    output to an asyncio StreamWriter
+    LineInput       input from a text file or pipe, sys.stdin by default
+    ListInput       input from a list of values, e.g. presets of a batch run
+    StreamInput     input from an asyncio StreamReader; only Program.runAsync can wait on it
+"""
+import asyncio
+import sys
+
+
+class Console:
+    def write(self, text):
+        sys.stdout.write(text)
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class BufferedOutput:
+    """
+    Collects writes and passes them on in one write() once size characters are pending.
+    stream is looked up at flush time when None, so redirected stdout is honoured.
+    """
+    def __init__(self, stream=None, size=1 << 16):
+        self.stream = stream
+        self.size = size
+        self.chunks = []
+        self.pending = 0
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.pending += len(text)
+        if self.pending >= self.size:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            (self.stream or sys.stdout).write("".join(self.chunks))
+            self.chunks = []
+            self.pending = 0
+
+
+class StreamOutput:
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, text):
+        # StreamWriter buffers by itself; drain() waits until the transport took it
+        self.writer.write(text.encode())
+
+    def flush(self):
+        pass
+
+    async def drain(self):
+        await self.writer.drain()
+
+
+class LineInput:
+    def __init__(self, file=None):
+        self.file = file
+
+    def readline(self):
+        # the next line, or None at end of input
+        return (self.file or sys.stdin).readline() or None
+
+    async def readlineAsync(self):
+        # files and pipes have no awaitable reads, so the blocking read goes to the default executor
+        return await asyncio.get_running_loop().run_in_executor(None, self.readline)
+
+
+class ListInput:
+    def __init__(self, values):
+        self.values = iter(values)
+
+    def readline(self):
+        return str(next(self.values, "")) or None
+
+    async def readlineAsync(self):
+        return self.readline()
+
+
+class StreamInput:
+    def __init__(self, reader):
+        self.reader = reader
+
+    def readline(self):
+        raise RuntimeError("input from an asyncio stream needs Program.runAsync")
+
+    async def readlineAsync(self):
+        return (await self.reader.readline()).decode() or None
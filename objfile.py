@@ -0,0 +1,194 @@
+"""
+Object file layout (little-endian):
+    header      magic "ISAO", version, flags, code words, data base, data words, symbols, source sha256
+    code        packed 32-bit instruction words, loaded from address 0
+    data        packed 32-bit words of the initial data image, loaded from data base
+    symbols     per symbol: name length (1 byte), name, packed 32-bit symbol address
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+import storage
+
+MAGIC = b"ISAO"
+VERSION = 2
+header = struct.Struct("<4sHHIIII32s")
+symbolWord = struct.Struct("<I")
+cacheDir = "__isacache__"
+
+
+def words(buffer):
+    # little-endian packed words to a native array('I')
+    packed = array('I')
+    packed.frombytes(buffer)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed
+
+
+def packed(values):
+    values = array('I', values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def sourceHash(filename):
+    # keyed on the source bytes and the object format version
+    with open(filename, "rb") as f:
+        return hashlib.sha256(f.read() + VERSION.to_bytes(2, "little")).digest()
+
+
+class ObjectWriter:
+    """
+    Writes an object file while its code is still being produced: a placeholder header, the code
+    words in buffered chunks, patches in place, then data, symbols and the real header on close().
+    The file is written aside and only renamed over filename by close(), like ObjectFile.write.
+    """
+    def __init__(self, filename, chunk=4096):
+        self.filename = filename
+        self.temp = f"{filename}.{os.getpid()}.tmp"
+        self.file = open(self.temp, "w+b")
+        self.file.write(bytes(header.size))
+        self.buffer = array('I')
+        self.chunk = chunk
+        self.count = 0
+
+    def write(self, word):
+        self.buffer.append(word)
+        self.count += 1
+        if len(self.buffer) >= self.chunk:
+            self.flush()
+
+    def flush(self):
+        self.file.write(packed(self.buffer))
+        del self.buffer[:]
+
+    def patch(self, address, field):
+        # or-s an operand field into an already written code word
+        self.flush()
+        offset = header.size + 4 * address
+        self.file.seek(offset)
+        word = symbolWord.unpack(self.file.read(4))[0] | field
+        self.file.seek(offset)
+        self.file.write(symbolWord.pack(word))
+        self.file.seek(0, os.SEEK_END)
+
+    def close(self, data=(), data_base=0, symbols=None, source_hash=bytes(32)):
+        self.flush()
+        symbols = symbols or {}
+        parts = [packed(data)]
+        for name, address in symbols.items():
+            name = name.encode()
+            parts.append(bytes([len(name)]) + name + symbolWord.pack(address))
+        self.file.write(b"".join(parts))
+        self.file.seek(0)
+        self.file.write(header.pack(MAGIC, VERSION, 0, self.count, data_base, len(data), len(symbols), source_hash))
+        self.file.close()
+        os.replace(self.temp, self.filename)
+
+    def abort(self):
+        # the last good object at filename stays
+        self.file.close()
+        os.remove(self.temp)
+
+
+class ObjectFile:
+    def __init__(self, code, data=(), data_base=0, symbols=None, source_hash=bytes(32)):
+        self.code = array('I', code)
+        self.data = array('I', data)
+        self.data_base = data_base
+        self.symbols = symbols or {}
+        self.source_hash = source_hash
+
+    @staticmethod
+    def assemble(program, machine=None, source_hash=bytes(32)):
+        """
+        Assembles source lines with the two-pass assembler on a fresh machine (or the given one).
+        """
+        from assembler import Assembler
+        obj = Assembler(machine or storage.Machine()).assemble(program)
+        obj.source_hash = source_hash
+        return obj
+
+    def write(self, filename):
+        parts = [header.pack(MAGIC, VERSION, 0, len(self.code), self.data_base, len(self.data),
+                             len(self.symbols), self.source_hash),
+                 packed(self.code), packed(self.data)]
+        for name, address in self.symbols.items():
+            name = name.encode()
+            parts.append(bytes([len(name)]) + name + symbolWord.pack(address))
+        # written next to the target and renamed over it, so readers never see a partial file
+        temp = f"{filename}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                f.write(b"".join(parts))
+            os.replace(temp, filename)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    @staticmethod
+    def read(filename):
+        """
+        Memory-maps an object file and copies its sections out in bulk.
+        Raises ValueError for a file that is not a complete object file.
+        """
+        with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, flags, code_len, data_base, data_len, symbol_len, source_hash = header.unpack_from(mm)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{filename} is not a version {VERSION} object file")
+            offset = header.size
+            if offset + 4 * (code_len + data_len) > len(mm):
+                raise ValueError(f"{filename} is truncated")
+            code = words(mm[offset:offset + 4 * code_len])
+            offset += 4 * code_len
+            data = words(mm[offset:offset + 4 * data_len])
+            offset += 4 * data_len
+            symbols = {}
+            for i in range(symbol_len):
+                if offset >= len(mm) or offset + 1 + mm[offset] + symbolWord.size > len(mm):
+                    raise ValueError(f"{filename} is truncated")
+                length = mm[offset]
+                name = mm[offset + 1:offset + 1 + length].decode()
+                offset += 1 + length
+                symbols[name] = symbolWord.unpack_from(mm, offset)[0]
+                offset += symbolWord.size
+        return ObjectFile(code, data, data_base, symbols, source_hash)
+
+    def load(self, machine):
+        """
+        Puts code, data image and symbols into the machine; returns the code words.
+        """
+        machine.setSymbols(self.symbols)
+        machine.memory.storeWords(0, self.code)
+        if self.data:
+            machine.memory.storeWords(self.data_base, self.data)
+        return self.code
+
+    @staticmethod
+    def cached(filename, machine=None):
+        """
+        Object for a source file from __isacache__ next to it, assembling and caching it when
+        the source hash changed or no object exists yet.
+        """
+        source_hash = sourceHash(filename)
+        directory = os.path.join(os.path.dirname(os.path.abspath(filename)), cacheDir)
+        cache = os.path.join(directory, source_hash.hex()[:32] + ".isao")
+        if os.path.exists(cache):
+            try:
+                obj = ObjectFile.read(cache)
+                if obj.source_hash == source_hash:
+                    return obj
+            except (ValueError, struct.error, IndexError, OSError):
+                # unreadable or malformed, assembled again below
+                pass
+        from run import readProgram
+        obj = ObjectFile.assemble(readProgram(filename), machine, source_hash)
+        os.makedirs(directory, exist_ok=True)
+        obj.write(cache)
+        return obj
@@ -0,0 +1,228 @@
+"""
+Optional peephole pass of the assembler. It runs on the statements after compare-and-branch
+expansion (Instruction.preEncode, Assembler.parse) and before encoding:
+
+    constant folding    arithmetic on registers with known constant values becomes MOV R<d> #<result>
+    dead moves          a MOV whose register is written again before any read in its block is dropped
+    superinstructions   two statements become one word, marked by the 5 trailing (extra) bits:
+        MOV Rd a; OP Rd b  ->  OP a b   extra d            R<d> = a OP b    (ADD SUB MUL DIV MOD)
+        SUB x y; Jxx z     ->  Jxx x y  extra z - pc + 16  R<x> = x - y, then the branch to z
+
+Blocks start at labels and end after jumps, CALL, RET and EOP; nothing is carried across them.
+Dropping and fusing moves code, so labels are re-addressed. A program that uses a label as data or
+jumps to a numeric address is only folded. The first instruction runs twice on this machine and is
+never folded, dropped or fused.
+"""
+from compiler import operations
+from convert import Word
+
+arithmetic = operations[3]
+conditionalJumps = ["JEQ", "JNE", "JLT", "JLE", "JGT", "JGE"]
+branches = operations[2] + ["CALL", "RET"]
+writes = arithmetic + ["MOV", "POP", "SCAN"]
+pure = (0b000, 0b001, 0b010, 0b011)     # operand fetches without side effects
+reach = 15                              # jump displacement range of a fused compare-and-branch
+registers = set(range(256))
+
+
+class Statement:
+    def __init__(self, lineno, line, op, operands, fields, extra=0):
+        self.lineno = lineno
+        self.line = line
+        self.op = op
+        self.operands = operands
+        self.fields = fields    # (mode, addr) per operand
+        self.extra = extra
+        self.target = None      # branch label of a fused compare-and-branch
+        self.pair = None        # the two statements a superinstruction replaced
+
+
+class Peephole:
+    def __init__(self, assembler):
+        self.assembler = assembler
+        self.before = self.after = 0
+        self.folded = self.dropped = self.fused = 0
+
+    def run(self, statements):
+        """
+        Optimized (lineno, line, op, operands, extra) statements; labels in the assembler's
+        symbol table are moved to the new addresses.
+        """
+        asm = self.assembler
+        self.before = len(statements)
+        self.folded = self.dropped = self.fused = 0
+        code = [Statement(lineno, line, op, operands,
+                          [asm.encodeOp(lineno, line, operand) for operand in operands])
+                for lineno, line, op, operands in statements]
+        self.original = {label: asm.symbols[label] for label in asm.labels}
+        leaders = set(self.original.values())
+        known = {}
+        for index, statement in enumerate(code):
+            if index in leaders:
+                known = {}
+            if index > 0:
+                self.fold(statement, known)
+            self.learn(statement, known)
+            if statement.op in branches or statement.op == "EOP":
+                known = {}
+        if self.movable(code):
+            code = self.fuse(self.deadMoves(code, leaders), leaders, len(code))
+        self.after = len(code)
+        return [(s.lineno, s.line, s.op, s.operands, s.extra) for s in code]
+
+    def report(self):
+        saved = self.before - self.after
+        percent = saved / self.before * 100 if self.before else 0.0
+        return (f"optimizer: {self.before} -> {self.after} instructions (-{saved}, {percent:.1f}%), "
+                f"{self.folded} folded, {self.dropped} dead moves, {self.fused} fused")
+
+    def stats(self):
+        return {"before": self.before, "after": self.after, "folded": self.folded,
+                "dropped": self.dropped, "fused": self.fused}
+
+    def movable(self, code):
+        # labels must only appear as branch targets, and branch targets must be labels
+        labels = self.assembler.labels
+        for statement in code:
+            for i, operand in enumerate(statement.operands):
+                target = statement.op in branches and i == len(statement.operands) - 1
+                if (operand in labels or operand[1:] in labels) != target:
+                    return False
+        return True
+
+    def constant(self, statement, i, known):
+        mode, addr = statement.fields[i]
+        if mode == 0b001:
+            return known.get(addr)
+        if mode in (0b000, 0b011) and statement.operands[i] not in self.assembler.labels:
+            return addr
+        return None
+
+    @staticmethod
+    def compute(op, a, b):
+        if op in ("DIV", "MOD") and b == 0:
+            return None     # the run reports the division by zero
+        result = {"ADD": a + b, "SUB": a - b, "MUL": a * b}.get(op)
+        if result is None:
+            result = a // b if op == "DIV" else a % b
+        try:
+            # the value the register holds after the store
+            return Word.word2dec(Word.dec2word(result))
+        except OverflowError:
+            return None
+
+    def fold(self, statement, known):
+        if statement.op not in arithmetic or len(statement.fields) != 2:
+            return
+        a, b = self.constant(statement, 0, known), self.constant(statement, 1, known)
+        if a is None or b is None:
+            return
+        result = self.compute(statement.op, a, b)
+        if result is not None and result == int(result) and 0 <= result < 256:
+            statement.op = "MOV"
+            statement.operands = [statement.operands[0], f"#{int(result)}"]
+            statement.fields = [statement.fields[0], (0b011, int(result))]
+            self.folded += 1
+
+    def learn(self, statement, known):
+        if statement.op not in writes or not statement.fields:
+            return
+        dest = statement.fields[0][1]
+        value = None
+        if statement.op == "MOV" and len(statement.fields) == 2:
+            value = self.constant(statement, 1, known)
+        elif statement.op in arithmetic and len(statement.fields) == 2:
+            a, b = self.constant(statement, 0, known), self.constant(statement, 1, known)
+            if a is not None and b is not None:
+                value = self.compute(statement.op, a, b)
+        if value is None:
+            known.pop(dest, None)
+        else:
+            known[dest] = value
+
+    @staticmethod
+    def reads(statement):
+        # register numbers whose values the statement uses; MOV, POP and SCAN discard their first operand
+        fields = statement.fields[1:] if statement.op in ("MOV", "POP", "SCAN") else statement.fields
+        return [addr for mode, addr in fields if mode == 0b001]
+
+    def deadMoves(self, code, leaders):
+        live = registers
+        kept = []
+        for index in range(len(code) - 1, -1, -1):
+            statement = code[index]
+            if statement.op in branches or statement.op == "EOP" or index + 1 in leaders:
+                live = registers
+            if (index > 0 and statement.op == "MOV" and len(statement.fields) == 2
+                    and statement.fields[0][0] == 0b001 and statement.fields[0][1] not in live
+                    and all(mode in pure for mode, addr in statement.fields)):
+                self.dropped += 1
+                continue
+            kept.append((index, statement))
+            if statement.op in writes and statement.fields:
+                live = live - {statement.fields[0][1]}
+            live = live | set(self.reads(statement))
+        kept.reverse()
+        return kept
+
+    def fuse(self, kept, leaders, length):
+        """
+        Statements of kept (index, statement) pairs with adjacent pairs fused, addressed so that
+        every fused branch reaches its label.
+        """
+        code, previous = [], -1
+        for index, statement in kept:
+            # a label on a dropped statement moves on to the next one kept
+            leader = any(address in leaders for address in range(previous + 1, index + 1))
+            if not (len(code) > 1 and not leader and code[-1].pair is None and self.fusePair(code, statement)):
+                code.append(statement)
+            previous = index
+        while True:
+            self.address(kept, code, length)
+            split = [i for i, s in enumerate(code) if s.target is not None
+                     and abs(self.assembler.symbols[s.target] - i) > reach]
+            if not split:
+                break
+            for i in reversed(split):
+                code[i:i + 1] = code[i].pair
+                self.fused -= 1
+        for i, statement in enumerate(code):
+            if statement.target is not None:
+                statement.extra = self.assembler.symbols[statement.target] - i + reach + 1
+        return code
+
+    def fusePair(self, code, second):
+        first = code[-1]
+        if len(first.fields) != 2:
+            return False
+        fused = None
+        if first.op == "MOV" and second.op in arithmetic and len(second.fields) == 2:
+            dest = first.fields[0]
+            if (dest[0] == 0b001 and 0 < dest[1] < 32 and second.fields[0] == dest
+                    and second.fields[1] != dest):
+                fused = Statement(second.lineno, second.line, second.op,
+                                  [first.operands[1], second.operands[1]],
+                                  [first.fields[1], second.fields[1]], dest[1])
+        elif (first.op == "SUB" and second.op in conditionalJumps and len(second.operands) == 1
+                and second.operands[0] in self.assembler.labels):
+            fused = Statement(second.lineno, second.line, second.op, first.operands, first.fields)
+            fused.target = second.operands[0]
+        if fused is None:
+            return False
+        fused.pair = [first, second]
+        code[-1] = fused
+        self.fused += 1
+        return True
+
+    def address(self, kept, code, length):
+        # every label moves to the new address of the first statement kept at or after it
+        new = {}
+        for address, statement in enumerate(code):
+            for part in statement.pair or [statement]:
+                new[id(part)] = address
+        following = [len(code)] * (length + 1)
+        kept = dict(kept)
+        for index in range(length - 1, -1, -1):
+            following[index] = new[id(kept[index])] if index in kept else following[index + 1]
+        for label, old in self.original.items():
+            self.assembler.symbols[label] = following[old]
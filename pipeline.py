@@ -0,0 +1,154 @@
+"""
+Cycle-level timing model of an in-order scalar pipeline, driven by the reference interpreter.
+
+    program.pipeline = Pipeline()                       # fetch, decode, execute, writeback
+    program.pipeline = Pipeline(["fetch", "decode", "execute", "memory", "writeback"],
+                                forwarding=True, latency={"MUL": 3, "DIV": 8})
+
+Registers are read in decode. Without forwarding a result can be read in the cycle its writeback
+happens. With forwarding it reaches the next execute straight away, or after the memory stage when
+it was loaded from memory or the stack. Branches (JEQ..JMP, CALL, RET) resolve in execute and
+flush the younger stages, unless branch_penalty says otherwise. An instruction with a multi-cycle
+latency holds execute, so the next instruction waits.
+"""
+import json
+from collections import Counter
+from compiler import operations
+
+branches = set(operations[2] + ["CALL", "RET"])
+writers = set(operations[3] + ["MOV", "POP", "SCAN"])
+loads = (0b010, 0b100, 0b101)   # operand modes that read memory
+
+
+class Pipeline:
+    def __init__(self, stages=("fetch", "decode", "execute", "writeback"), forwarding=False,
+                 latency=None, branch_penalty=None):
+        stages = list(stages)
+        for stage in ("decode", "execute", "writeback"):
+            if stage not in stages:
+                raise ValueError(f"pipeline needs a {stage} stage")
+        self.stages = stages
+        self.forwarding = forwarding
+        self.latency = dict(latency or {})
+        self.decode = stages.index("decode")
+        self.execute = stages.index("execute")
+        self.writeback = stages.index("writeback")
+        self.memory = stages.index("memory") if "memory" in stages else self.execute
+        if not self.decode < self.execute <= self.memory < self.writeback:
+            raise ValueError("stages must run decode, execute, memory, writeback in that order")
+        self.branchPenalty = self.execute if branch_penalty is None else branch_penalty
+        self.machine = None
+        self.reset()
+
+    @staticmethod
+    def fromConfig(config):
+        # keyword arguments of Pipeline as parsed JSON, e.g. {"forwarding": true, "latency": {"MUL": 3}}
+        return Pipeline(**config)
+
+    def reset(self):
+        self.instructions = 0
+        self.issue = None       # cycle the latest instruction entered execute
+        self.busy = 1           # cycles it holds execute
+        self.redirect = 0       # cycles lost to the latest branch
+        self.ready = {}         # register slot -> (first cycle a consumer can enter execute, same without forwarding)
+        self.stalls = Counter()
+        self.hazards = Counter()
+        self.branches = 0
+
+    def attach(self, machine):
+        self.machine = machine
+
+    def detach(self):
+        pass
+
+    def operands(self, instruction):
+        # (register slots read, register slot written, result comes from memory)
+        machine = self.machine
+        fields = ((instruction.mode1, instruction.addr1), (instruction.mode2, instruction.addr2))
+        if instruction.name in ("MOV", "POP", "SCAN"):
+            # the first operand only names the destination
+            fields = fields[1:]
+        reads, load = [], False
+        for mode, addr in fields:
+            if mode == 0b001:
+                reads.append(machine.operands[addr])
+            elif mode == 0b100:
+                reads.append(machine.slots["I1"])
+            load = load or mode in loads
+        written = None
+        if instruction.name in writers:
+            written = machine.operands[instruction.extra or instruction.addr1]
+        elif instruction.name in branches and instruction.extra:
+            # fused compare-and-branch, see peephole.py
+            written = machine.operands[instruction.addr1]
+        return reads, written, load and instruction.name in ("MOV", "POP")
+
+    def step(self, instruction):
+        if self.issue is None:
+            start = self.execute
+        else:
+            start = self.issue + 1
+            if self.busy > 1:
+                self.stalls["structural"] += self.busy - 1
+                start += self.busy - 1
+            if self.redirect:
+                self.stalls["branch"] += self.redirect
+                start += self.redirect
+        reads, written, load = self.operands(instruction)
+        issue, hazard = start, False
+        for slot in reads:
+            if slot in self.ready:
+                ready, committed = self.ready[slot]
+                # a hazard whenever the producer has not written back yet, forwarded or not
+                hazard = hazard or committed > start
+                issue = max(issue, ready)
+        if hazard:
+            self.hazards["RAW"] += 1
+        if issue > start:
+            self.stalls["data"] += issue - start
+            self.hazards["RAW stalled"] += 1
+        latency = self.latency.get(instruction.name, 1)
+        if written is not None:
+            committed = issue + latency - 1 + self.writeback - self.decode
+            if self.forwarding:
+                ready = issue + latency + (self.memory - self.execute if load else 0)
+            else:
+                ready = committed
+            self.ready[written] = (ready, committed)
+        self.redirect = self.branchPenalty if instruction.name in branches else 0
+        self.branches += instruction.name in branches
+        self.issue, self.busy = issue, latency
+        self.instructions += 1
+
+    @property
+    def cycles(self):
+        if self.issue is None:
+            return 0
+        # the last instruction leaves writeback
+        return self.issue + self.busy + len(self.stages) - 1 - self.execute
+
+    def report(self):
+        cycles = self.cycles
+        return {"stages": self.stages, "forwarding": self.forwarding, "instructions": self.instructions,
+                "cycles": cycles, "cpi": cycles / self.instructions if self.instructions else 0.0,
+                "stalls": dict(self.stalls), "stall_cycles": sum(self.stalls.values()),
+                "hazards": dict(self.hazards), "branches": self.branches}
+
+    def table(self):
+        report = self.report()
+        lines = [f"pipeline: {' > '.join(self.stages)}, forwarding {'on' if self.forwarding else 'off'}",
+                 f"{'instructions':<20}{report['instructions']:>10}",
+                 f"{'cycles':<20}{report['cycles']:>10}",
+                 f"{'CPI':<20}{report['cpi']:>10.3f}",
+                 f"{'stall cycles':<20}{report['stall_cycles']:>10}"]
+        lines += [f"{'  ' + cause:<20}{count:>10}" for cause, count in sorted(self.stalls.items())]
+        lines += [f"{'branches':<20}{report['branches']:>10}"]
+        lines += [f"{'hazards ' + kind:<20}{count:>10}" for kind, count in sorted(self.hazards.items())]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, filename):
+        with open(filename, "w") as f:
+            if filename.endswith(".json"):
+                json.dump(self.report(), f, indent=1)
+            else:
+                f.write(self.table())
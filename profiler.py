@@ -0,0 +1,99 @@
+import json
+from collections import Counter
+
+modeNames = {0b000: "000 direct value", 0b001: "001 register", 0b010: "010 memory", 0b011: "011 immediate",
+             0b100: "100 indexed", 0b101: "101 stack", 0b110: "110", 0b111: "111"}
+
+
+def opClass(code):
+    # the execute and write bits of the opcode split the ISA into three groups
+    if code >> 4:
+        return "execute"
+    if code >> 3 & 1:
+        return "write"
+    return "print"
+
+
+class Profiler:
+    """
+    Execution profile of Program.run: counts per opcode, per operand mode and per PC,
+    register and memory reads/writes, and wall time per opcode class. The run loop's own PC and IR
+    loads and stores are counted apart from the registers the instructions touch.
+    Only costs anything while attached to a program.
+    """
+    def __init__(self):
+        self.opcodes = Counter()
+        self.modes = Counter()
+        self.pcs = Counter()
+        self.access = Counter()
+        self.classTime = Counter()
+        self.classCount = Counter()
+        self.patched = []
+
+    def step(self, pc, instruction, elapsed):
+        self.opcodes[instruction.name] += 1
+        self.modes[instruction.mode1] += 1
+        self.modes[instruction.mode2] += 1
+        self.pcs[pc] += 1
+        group = opClass(instruction.code)
+        self.classTime[group] += elapsed
+        self.classCount[group] += 1
+
+    def attach(self, machine):
+        """
+        Counts loads and stores of the machine's register and memory until detach().
+        """
+        bookkeeping = {machine.slots["PC"], machine.slots["IR"]}
+        for name, storage in (("register", machine.register), ("memory", machine.memory)):
+            for method in ("load", "store"):
+                kind = "reads" if method == "load" else "writes"
+                self.patch(storage, method, f"{name} {kind}",
+                           f"PC/IR {kind}" if name == "register" else None, bookkeeping)
+
+    def patch(self, storage, method, key, bookkeepingKey=None, bookkeeping=()):
+        # accesses to the bookkeeping addresses are counted under bookkeepingKey, when given
+        original = getattr(storage, method)
+        access = self.access
+        def counted(address, *args, **kwargs):
+            access[bookkeepingKey if bookkeepingKey and address in bookkeeping else key] += 1
+            return original(address, *args, **kwargs)
+        setattr(storage, method, counted)
+        self.patched.append((storage, method))
+
+    def detach(self):
+        for storage, method in self.patched:
+            delattr(storage, method)
+        self.patched = []
+
+    def report(self):
+        return {
+            "opcodes": dict(self.opcodes.most_common()),
+            "modes": {modeNames[mode]: count for mode, count in self.modes.most_common()},
+            "pcs": {str(pc): count for pc, count in self.pcs.most_common()},
+            "access": dict(self.access),
+            "classes": {group: {"count": self.classCount[group], "seconds": self.classTime[group]}
+                        for group in self.classCount},
+        }
+
+    def table(self, top=20):
+        total = sum(self.opcodes.values()) or 1
+        lines = [f"{'opcode':<12}{'count':>10}{'share':>9}"]
+        lines += [f"{name:<12}{count:>10}{count / total:>9.1%}" for name, count in self.opcodes.most_common()]
+        lines += ["", f"{'operand mode':<20}{'count':>10}"]
+        lines += [f"{modeNames[mode]:<20}{count:>10}" for mode, count in self.modes.most_common()]
+        lines += ["", f"{'class':<12}{'count':>10}{'seconds':>12}{'us/instr':>10}"]
+        for group, seconds in self.classTime.most_common():
+            count = self.classCount[group]
+            lines.append(f"{group:<12}{count:>10}{seconds:>12.6f}{seconds / count * 1e6:>10.2f}")
+        lines += ["", f"{'storage access':<20}{'count':>10}"]
+        lines += [f"{key:<20}{count:>10}" for key, count in sorted(self.access.items())]
+        lines += ["", f"{'pc':<12}{'hits':>10}"]
+        lines += [f"{pc:<12}{count:>10}" for pc, count in self.pcs.most_common(top)]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, filename):
+        with open(filename, "w") as f:
+            if filename.endswith(".json"):
+                json.dump(self.report(), f, indent=1)
+            else:
+                f.write(self.table())
@@ -1,38 +1,99 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
 import sys
+import time
 import compiler
 from addressing import Access, AddressingMode
 import storage
+import tracing
+import devices
 from convert import Precision, Length
+from decode import DecodeCache
+from objfile import ObjectFile
+from assembler import Assembler, AssemblyError, IncrementalAssembler, SourceFile, sourceLines
 
 class Program:
-    def __init__(self, program):
-        self.program = self.encode(program)
-        # Load encoded instructions into memory
-        for i, instr in enumerate(self.program):
-            storage.memory.store(i, instr)
+    def __init__(self, program, machine=None):
+        # each program runs on its own machine when one is given, else on the default one
+        self.machine = machine or storage.machine
+        if not isinstance(program, (ObjectFile, SourceFile)):
+            program = self.assemble(program)
+        # packed words, data image and symbols go straight into memory
+        self.program = program.load(self.machine)
+        if isinstance(program, SourceFile):
+            self.assembler = program.assembler
         # Initialize PC and IR to 0
-        storage.register.store(storage.variable.load('PC', isCode=False), 0)
-        storage.register.store(storage.variable.load('IR', isCode=False), 0)
+        self.machine.register.store(self.machine.variable.load('PC', isCode=False), 0)
+        self.machine.register.store(self.machine.variable.load('IR', isCode=False), 0)
+        self.cache = DecodeCache.of(self.machine.memory)
+        self.tracer = tracing.tracer
+        self.profiler = None
+        self.pipeline = None
+        self.caches = None
+        self.debugger = None
+        # PRNT/EOP text and SCAN values go through these devices, see devices.py
+        self.output = devices.Console()
+        self.input = devices.LineInput()
+    
+    def runInputs(self, inputs):
+        """
+        Runs the loaded image once per register preset, e.g. [{"R1": 5}, {"R1": 7}]. Every run
+        forks from one machine snapshot, so it only undoes what the previous run stored.
+        Yields a result per preset with its output and final registers, like batch.runFile.
+        """
+        snapshot = self.machine.snapshot()
+        for preset in inputs:
+            self.machine.restore(snapshot)
+            out = io.StringIO()
+            steps, error = None, None
+            start = time.perf_counter()
+            try:
+                # an unknown register name fails this run only
+                for name, value in preset.items():
+                    self.machine.register.store(self.machine.slots[name], value)
+                with contextlib.redirect_stdout(out):
+                    steps = self.run()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            yield {"input": preset, "instructions": steps, "time": time.perf_counter() - start,
+                   "error": error, "output": out.getvalue(), "registers": self.machine.registers()}
+
+    def reload(self, program, image):
+        """
+        Loads a reassembled ObjectFile into the warm machine. The machine goes back to image, the
+        snapshot taken after the previous load, and only code words that differ are stored, so decoded
+        and translated instructions at the other addresses stay cached. Returns the new snapshot.
+        """
+        machine = self.machine
+        machine.restore(image)
+        old, new = self.program, program.code
+        for address, word in enumerate(new):
+            if address >= len(old) or old[address] != word:
+                machine.memory.storeWord(address, word)
+        for address in range(len(new), len(old)):
+            machine.memory.storeWord(address, 0)
+        if program.data:
+            machine.memory.storeWords(program.data_base, program.data)
+        machine.setSymbols(program.symbols)
+        self.program = program.code
+        machine.register.store(machine.slots['PC'], 0)
+        machine.register.store(machine.slots['IR'], 0)
+        return machine.snapshot()
+
+    def close(self):
+        """
+        Releases what the engine hooked into its machine, for machines that outlive the engine.
+        """
+
+    def assemble(self, program):
+        self.assembler = Assembler(self.machine)
+        return self.assembler.assemble(program)
     
     def encode(self, program):
-        encoded_program = []
-        for instruction in program:
-            pre_encoded = self.pre_encode(instruction)
-            # If pre_encoded is a list, encode each item
-            if isinstance(pre_encoded, list):
-                for instr in pre_encoded:
-                    if hasattr(compiler.Instruction, 'encode'):
-                        encoded = compiler.Instruction.encode(instr)
-                    else:
-                        encoded = instr
-                    encoded_program.append(encoded)
-            else:
-                if hasattr(compiler.Instruction, 'encode'):
-                    encoded = compiler.Instruction.encode(pre_encoded)
-                else:
-                    encoded = pre_encoded
-                encoded_program.append(encoded)
-        return encoded_program
+        return compiler.Instruction.assemble(program, self.machine)
     
     def pre_encode(self, instruction):
 
@@ -51,46 +112,46 @@ class Program:
         elif opcode == "DIV":
             if op2 == 0:
                 div_exception = self.exception("DivisionByZero", 0)
-                div_exception.dispMSG()
+                self.emit(div_exception.message)
                 return 0
             return (op1 if op1 is not None else 0) // op2
         elif opcode == "MOD":
             if op2 == 0:
                 div_exception = self.exception("DivisionByZero", 0)
-                div_exception.dispMSG()
+                self.emit(div_exception.message)
                 return 0
             return (op1 if op1 is not None else 0) % op2
-        elif opcode in ["JEQ", "JNE", "JLT", "JLE", "JGT", "JGE", "JMP"]:
-            print("Jump operation: {}".format(opcode))
-            return op1
-        elif opcode == "CALL":
-            print("Call operation")
-            return op1
-        elif opcode == "RET":
-            print("Return operation")
-            return op1
-        elif opcode == "SCAN":
-            print("Scan operation")
-            return op1
-        elif opcode in ["PRNT", "EOP"]:
-            print("Print/End operation")
+        elif opcode in ["JEQ", "JNE", "JLT", "JLE", "JGT", "JGE", "JMP", "CALL", "RET", "SCAN", "PRNT", "EOP"]:
+            # control flow shows up as tracing events from the run loop
             return op1
         else:
             raise ValueError("Unsupported opcode: {}".format(opcode))
     
     def write(self, dest, src, movcode):
+        """
+        Register and stack writes: MOV and SCAN store src into register slot dest, PUSH stores src
+        at TSP + 1 and moves TSP there, POP loads the word at TSP into register slot dest and moves
+        TSP down, raising RuntimeError below SPR. Returns the value written.
+        """
         if movcode == "MOV":
             if hasattr(Access, 'store'):
-                Access.store("reg", dest, src)
+                Access.store("reg", dest, src, self.machine)
             return src
         elif movcode == "PUSH":
-            if hasattr(AddressingMode, 'stack'):
-                AddressingMode.stack(src, "push")
+            # src goes to the new stack top in memory
+            top = AddressingMode.stack("push", self.machine)
+            Access.store("mem", top, src, self.machine)
             return src
-        elif movcode == "POP":
-            if hasattr(AddressingMode, 'stack'):
-                return AddressingMode.stack(dest, "pop")
+        elif movcode == "SCAN":
+            # src is the value read from the input device
+            Access.store("reg", dest, src, self.machine)
             return src
+        elif movcode == "POP":
+            # the stack top goes to register dest
+            top = AddressingMode.stack("pop", self.machine)
+            value = self.machine.memory.load(top)
+            Access.store("reg", dest, value, self.machine)
+            return value
         else:
             raise ValueError("Unsupported movcode: {}".format(movcode))
         
@@ -110,94 +171,193 @@ class Program:
         else:
             return Except("Unknown exception: {}".format(value), False)
     
-    def run(self):
+    def emit(self, text):
+        self.output.write(text + "\n")
+
+    def scan(self):
+        # value for SCAN from the next line of the input device
+        return self.scanned(self.input.readline())
+
+    def scanned(self, line):
+        """
+        Value for SCAN from one input line; None is the end of input.
+        """
+        if line is None:
+            raise EOFError("SCAN: end of input")
+        try:
+            return float(line)
+        except ValueError:
+            raise ValueError(f"SCAN: invalid number {line.strip()!r}") from None
+
+    def observed(self):
+        # tracing, profiling and the timing and cache models need the per-step hooks of the reference interpreter
+        return (self.tracer is not None or self.profiler is not None or self.pipeline is not None
+                or self.caches is not None)
+    
+    def attached(self):
+        # a debugger drives the run loop itself; running around it would stop at its breakpoints forever
+        if self.debugger is not None:
+            raise RuntimeError("the program is attached to a debugger, continue with its cont() or finish()")
+
+    def run(self, resume=False):
+        # SCAN reads block on the input device
+        self.attached()
+        execution = self.execution(resume=resume)
+        try:
+            request = next(execution)
+            while True:
+                request = execution.send(self.input.readline() if request == "SCAN" else None)
+        except StopIteration as stop:
+            return stop.value
+
+    async def runAsync(self, slice=1024):
+        """
+        Runs the reference interpreter loop as a coroutine: it awaits the input device at SCAN and
+        gives other tasks a turn every slice instructions, so one event loop can serve many sessions.
+        """
+        self.attached()
+        execution = Program.execution(self, slice)
+        drain = getattr(self.output, "drain", None)
+        try:
+            request = next(execution)
+            while True:
+                if drain is not None:
+                    await drain()
+                if request == "SCAN":
+                    request = execution.send(await self.input.readlineAsync())
+                else:
+                    await asyncio.sleep(0)
+                    request = execution.send(None)
+        except StopIteration as stop:
+            if drain is not None:
+                await drain()
+            return stop.value
+
+    def execution(self, slice=None, resume=False):
+        """
+        The interpreter loop as a generator: yields "SCAN" and expects the input line sent back,
+        yields None every slice instructions when slice is set and "BREAK" when the debugger stops
+        before an instruction. Returns the step count.
+        resume continues at IR, where a previous run stopped, instead of starting over from PC.
+        """
         # Get register addresses 
-        pc_addr = storage.variable.load('PC', isCode=False)
-        ir_addr = storage.variable.load('IR', isCode=False)
+        pc_addr = self.machine.slots['PC']
+        ir_addr = self.machine.slots['IR']
         
-        storage.register.store(ir_addr, storage.register.load(pc_addr, isCode=False))
-        while True:
-            ir_val = storage.register.load(ir_addr, isCode=False)
-            instruction = storage.memory.load(int(ir_val), isCode=True)     
-            
-            if instruction == '0' * 32 or not instruction:
-                break
-               
-            opcode = instruction[0:5]           
-            op1_mode = instruction[5:8]         
-            op1_addr = instruction[8:16]        
-            op2_mode = instruction[16:19]       
-            op2_addr = instruction[19:27]       
-            extra = instruction[27:32]          
-            
-            op_map = {
-                "00000": "PRNT", "00001": "EOP", "01000": "MOV",
-                "01001": "PUSH", "01010": "POP", "01011": "CALL",
-                "01100": "RET", "01101": "SCAN", "01110": "DEF",
-                "10000": "JEQ", "10001": "JNE", "10010": "JLT",
-                "10011": "JLE", "10100": "JGT", "10101": "JGE",
-                "10110": "JMP", "11000": "MOD", "11001": "ADD",
-                "11010": "SUB", "11011": "MUL", "11100": "DIV"
-            }
-            operation = op_map.get(opcode, "UNKNOWN")
-            
-            op1_value = self.getOp(op1_mode + op1_addr)
-            op2_value = self.getOp(op2_mode + op2_addr)
-            
-            execute_bit = opcode[0]
-            write_bit = opcode[1]
-            
-            if execute_bit == '1':
-                result = self.execute(None, operation, op1_value, op2_value)
-                if operation in ["ADD", "SUB", "MUL", "DIV", "MOD"]:
-                    dest_reg_num = int(op1_addr, 2)
-                    dest_reg_name = f"R{dest_reg_num}"
-                    dest_reg_addr = storage.variable.load(dest_reg_name, isCode=False)
-                    Access.store("reg", dest_reg_addr, result)
-            elif write_bit == '1':
-                if operation == "MOV":
-                    dest_reg_num = int(op1_addr, 2)
-                    dest_reg_name = f"R{dest_reg_num}"
-                    dest_reg_addr = storage.variable.load(dest_reg_name, isCode=False)
-                    self.write(dest_reg_addr, op2_value, operation)
-                else:
-                    self.write(op1_value, op2_value, operation)
-            else:
-                # Print/end operations
-                if operation == "PRNT":
-                    print(f"Printing: {op1_value}")
-                elif operation == "EOP":
-                    print("End of program")
-                    break    
+        if not resume:
+            self.machine.register.store(ir_addr, self.machine.register.load(pc_addr, isCode=False))
+        steps = 0
+        halt = False
+        tracer = self.tracer
+        profiler = self.profiler
+        debugger = self.debugger
+        pipeline = self.pipeline
+        caches = self.caches
+        if profiler is not None:
+            profiler.attach(self.machine)
+            clock = time.perf_counter
+        if pipeline is not None:
+            pipeline.attach(self.machine)
+        if caches is not None:
+            caches.attach(self.machine)
+        try:
+            while True:
+                ir_val = self.machine.register.load(ir_addr, isCode=False)
+                instruction = self.cache.fetch(int(ir_val))
+                
+                if instruction is None:
+                    break
+                if debugger is not None:
+                    while debugger.stop(int(ir_val)):
+                        yield "BREAK"
+                steps += 1
+                if profiler is not None:
+                    start = clock()
+                
+                operation = instruction.name
+                
+                op1_value = self.fetchOp(instruction.mode1, instruction.addr1)
+                op2_value = self.fetchOp(instruction.mode2, instruction.addr2)
+                
+                execute_bit = instruction.code >> 4
+                write_bit = instruction.code >> 3 & 1
+                result = None
                 
-            pc_val = storage.register.load(pc_addr, isCode=False)
-            storage.register.store(ir_addr, pc_val)
-            storage.register.store(pc_addr, int(pc_val) + 1)
+                if execute_bit:
+                    result = self.execute(None, operation, op1_value, op2_value)
+                    if operation in ["ADD", "SUB", "MUL", "DIV", "MOD"]:
+                        # a fused MOV/arithmetic pair names its destination in the extra bits
+                        dest_reg_addr = self.machine.operandSlot(instruction.extra or instruction.addr1)
+                        Access.store("reg", dest_reg_addr, result, self.machine)
+                    elif instruction.extra:
+                        # fused compare-and-branch: the SUB it replaced
+                        result = op1_value - op2_value
+                        dest_reg_addr = self.machine.operandSlot(instruction.addr1)
+                        Access.store("reg", dest_reg_addr, result, self.machine)
+                elif write_bit:
+                    if operation == "MOV" or operation == "POP":
+                        dest_reg_addr = self.machine.operandSlot(instruction.addr1)
+                        result = self.write(dest_reg_addr, op2_value, operation)
+                    elif operation == "SCAN":
+                        dest_reg_addr = self.machine.operandSlot(instruction.addr1)
+                        result = self.write(dest_reg_addr, self.scanned((yield "SCAN")), operation)
+                    elif operation == "PUSH":
+                        result = self.write(None, op1_value, operation)
+                    else:
+                        result = self.write(op1_value, op2_value, operation)
+                else:
+                    # Print/end operations
+                    if operation == "PRNT":
+                        self.emit(f"Printing: {op1_value}")
+                    elif operation == "EOP":
+                        self.emit("End of program")
+                        halt = True
+                if profiler is not None:
+                    profiler.step(int(ir_val), instruction, clock() - start)
+                if tracer is not None:
+                    tracer.step(int(ir_val), operation, op1_value, op2_value, result)
+                if pipeline is not None:
+                    pipeline.step(instruction)
+                if caches is not None:
+                    caches.step(int(ir_val), instruction)
+                if halt:
+                    break
+                    
+                pc_val = self.machine.register.load(pc_addr, isCode=False)
+                self.machine.register.store(ir_addr, pc_val)
+                self.machine.register.store(pc_addr, int(pc_val) + 1)
+                if slice is not None and steps % slice == 0:
+                    yield None
+        finally:
+            self.output.flush()
+            if caches is not None:
+                caches.detach()
+            if profiler is not None:
+                profiler.detach()
+            if pipeline is not None:
+                pipeline.detach()
+        return steps
     
     def getOp(self, inscode):
-        mode = inscode[0:3]
-        addr = inscode[3:]
-
-        if mode == '000':
-            return int(addr, 2)
-        elif mode == '001':
-            reg_name = f"R{int(addr, 2)}"
-            reg_addr = storage.variable.load(reg_name, isCode=False)
-            return storage.register.load(reg_addr, isCode=False)
-        elif mode == '010':
-            mem_addr = int(addr, 2)
-            return storage.memory.load(mem_addr)
-        elif mode == '011':  # Immediate value
-            return int(addr, 2)
-        elif mode == '100':
-            index_reg = storage.variable.load('I1', isCode=False)
-            index_val = storage.register.load(index_reg, isCode=False)
-            displacement = int(addr, 2)
-            return storage.memory.load(index_val + displacement, isCode=False)
-        elif mode == '101':
-            return AddressingMode.stack("pop")
+        return self.fetchOp(int(inscode[0:3], 2), int(inscode[3:], 2))
+    
+    def fetchOp(self, mode, addr):
+        # mode and addr are the decoded integer fields of an operand
+        if mode == 0b000:
+            return addr
+        elif mode == 0b001:
+            return self.machine.register.load(self.machine.operandSlot(addr))
+        elif mode == 0b010:
+            return self.machine.memory.load(addr)
+        elif mode == 0b011:  # Immediate value
+            return addr
+        elif mode == 0b100:
+            index_val = self.machine.register.load(self.machine.slots['I1'])
+            return self.machine.memory.load(index_val + addr, isCode=False)
+        elif mode == 0b101:
+            return AddressingMode.stack("pop", self.machine)
         else:
-            raise ValueError(f"Unsupported addressing mode: {mode}")
+            raise ValueError(f"Unsupported addressing mode: {mode:03b}")
 
 class Except:
 
@@ -220,13 +380,259 @@ class Except:
     def getReturn(self):
         return self.ret
     
-if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python run.py <program_file>")
-        sys.exit(1)
-    filename = sys.argv[1]
+def readProgram(filename):
+    # source lines without blanks and // comments
     with open(filename, "r") as f:
-        lines = [line.strip() for line in f if line.strip() and not line.strip().startswith("//")]
-    prog = Program(lines)
-    prog.run()
\ No newline at end of file
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("//")]
+
+def watch(filename, engine_name="interp", machine=None, interval=0.5):
+    """
+    Runs a source file and reruns it whenever its modification time changes, until interrupted.
+    Reassembly is incremental and the machine, decode cache and engine stay warm between runs.
+    """
+    machine = machine or storage.machine
+    assembler = IncrementalAssembler(machine)
+    prog, image, mtime = None, None, None
+    try:
+        while True:
+            current = os.stat(filename).st_mtime_ns
+            if current != mtime:
+                mtime = current
+                try:
+                    obj = assembler.assemble(readProgram(filename))
+                except AssemblyError as e:
+                    print(f"{filename}: {e}")
+                    obj = None
+                if obj is not None:
+                    if prog is None:
+                        prog = engine(engine_name)(obj, machine)
+                        image = machine.snapshot()
+                    else:
+                        print(f"--- {filename} changed: {assembler.encoded} lines encoded, "
+                              f"{assembler.reused} reused")
+                        image = prog.reload(obj, image)
+                    try:
+                        prog.run()
+                    except Exception as e:
+                        print(f"{type(e).__name__}: {e}")
+                    sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+def peakMemory():
+    # peak resident set size of this process so far, where the platform reports it
+    try:
+        import resource
+    except ImportError:
+        return "unavailable"
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024
+    return f"{peak / 1024:.1f} MiB"
+
+async def serve(program, engine_name="interp", host="127.0.0.1", port=8132):
+    """
+    Serves one loaded program over TCP: every connection runs it on a fresh machine, with SCAN
+    reading lines from the client and PRNT writing back to it. Sessions share one event loop.
+    """
+    cls = engine(engine_name)
+
+    async def session(reader, writer):
+        prog = cls(program, storage.Machine())
+        prog.input = devices.StreamInput(reader)
+        prog.output = devices.StreamOutput(writer)
+        try:
+            await prog.runAsync()
+        except (EOFError, ValueError) as e:
+            prog.emit(str(e))
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(session, host, port)
+    async with server:
+        await server.serve_forever()
+
+def jsonArgument(value):
+    # command-line JSON: inline when it starts like an object or list, else the name of a file holding it
+    if value.lstrip()[:1] in ("{", "["):
+        return json.loads(value)
+    with open(value) as f:
+        return json.load(f)
+
+def engine(name):
+    # engines live in their own modules and subclass Program
+    if name == "threaded":
+        from threaded import ThreadedProgram
+        return ThreadedProgram
+    if name == "block":
+        from blocks import BlockProgram
+        return BlockProgram
+    return Program
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Assemble and run an ISA program")
+    parser.add_argument("program_file", nargs="?")
+    parser.add_argument("--engine", choices=["interp", "threaded", "block"], default="interp",
+                        help="execution engine (default: interp)")
+    parser.add_argument("--stats", action="store_true", help="report instructions per second")
+    parser.add_argument("--batch", metavar="DIR_OR_GLOB", help="run every program in a directory or glob")
+    parser.add_argument("--report", default="report.json", help="batch or --inputs report file, .json or .csv")
+    parser.add_argument("--jobs", type=int, default=None, help="batch worker processes (default: CPU count)")
+    parser.add_argument("--assemble", metavar="OBJECT", help="write the assembled object file and exit")
+    parser.add_argument("--no-cache", action="store_true", help="always re-assemble .txt sources")
+    parser.add_argument("--watch", action="store_true",
+                        help="rerun the program whenever the source file changes, until Ctrl-C")
+    parser.add_argument("--stream", action="store_true",
+                        help="assemble while reading, straight into memory or the --assemble object")
+    parser.add_argument("--trace", metavar="FILE", help="record execution events and dump them to FILE")
+    parser.add_argument("--trace-level", choices=["info", "debug"], default="info",
+                        help="info: control flow only, debug: every instruction (default: info)")
+    parser.add_argument("--trace-size", type=int, default=4096, help="trace ring buffer size in events")
+    parser.add_argument("--profile", metavar="FILE", nargs="?", const="-",
+                        help="profile the run; table on stderr, or FILE (.json for JSON)")
+    parser.add_argument("--pipeline", metavar="JSON", nargs="?", const="",
+                        help="time the run on a pipeline model (Pipeline arguments as inline JSON or a JSON file); "
+                             "report on stderr")
+    parser.add_argument("--caches", metavar="JSON", nargs="?", const="",
+                        help="simulate instruction and data caches (CacheModel config as inline JSON or a JSON file); "
+                             "report on stderr")
+    parser.add_argument("--inputs", metavar="JSON",
+                        help="run once per register preset in a JSON list, inline or a file, "
+                             "e.g. [{\"R1\": 5}, {\"R1\": 7}]")
+    parser.add_argument("--memory", type=int, metavar="WORDS",
+                        help="sparse paged memory of WORDS cells (up to 2**24) instead of 256")
+    parser.add_argument("--layout", metavar="JSON",
+                        help="memory region bases as inline JSON or a JSON file, e.g. {\"mapr\": 4096}")
+    parser.add_argument("--input", metavar="FILE", help="read SCAN values from FILE, one per line (default: stdin)")
+    parser.add_argument("--buffered", action="store_true", help="buffer program output and write it in bulk")
+    parser.add_argument("--debug", action="store_true",
+                        help="run under the debugger: breakpoints, watchpoints, step, run to cursor")
+    parser.add_argument("--optimize", action="store_true",
+                        help="fold constants, drop dead moves and fuse superinstructions; reports the savings")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="serve the program on a TCP port, one fresh run per connection")
+    args = parser.parse_args()
+    if args.batch:
+        import batch
+        results = batch.runBatch(batch.programFiles(args.batch), args.engine, args.jobs, args.optimize)
+        batch.writeReport(results, args.report)
+        failed = sum(1 for result in results if result["error"])
+        print(f"{len(results)} programs, {failed} failed, report written to {args.report}")
+        if args.optimize:
+            before = sum(result["optimizer"]["before"] for result in results if result["optimizer"])
+            after = sum(result["optimizer"]["after"] for result in results if result["optimizer"])
+            print(f"optimizer: {before} -> {after} instructions in total")
+        sys.exit(1 if failed else 0)
+    if not args.program_file:
+        parser.error("program_file is required unless --batch is given")
+    if args.optimize and (args.watch or args.stream):
+        parser.error("--optimize needs the whole program and cannot be combined with --watch or --stream")
+    if args.trace:
+        tracing.tracer = tracing.Tracer(tracing.levels[args.trace_level], args.trace_size)
+    machine = None
+    if args.memory or args.layout:
+        if args.memory and not 0 < args.memory <= 2**24:
+            parser.error("--memory must be between 1 and 2**24 words")
+        mem_len = args.memory or storage.mem_len
+        layout = storage.Layout.scaled(mem_len)
+        if args.layout:
+            layout = storage.Layout(**dict(zip(storage.Layout.regions, layout.key()), **jsonArgument(args.layout)))
+        machine = storage.Machine(storage.reg_len, mem_len, layout, paged=bool(args.memory))
+    if args.watch:
+        print(f"Watching {args.program_file}, Ctrl-C to stop")
+        watch(args.program_file, args.engine, machine)
+        sys.exit(0)
+    if args.program_file.endswith(".isao"):
+        program = ObjectFile.read(args.program_file)
+    elif args.optimize:
+        # optimized objects bypass the cache, which holds plain assemblies
+        assembler = Assembler(machine or storage.Machine(), optimize=True)
+        program = assembler.assemble(readProgram(args.program_file))
+        print(assembler.optimizer.report(), file=sys.stderr)
+        if args.assemble:
+            program.write(args.assemble)
+            sys.exit(0)
+    elif args.assemble and args.stream:
+        from objfile import sourceHash
+        assembler = Assembler(storage.Machine())
+        assembler.streamObject(sourceLines(args.program_file), args.assemble, sourceHash(args.program_file))
+        if args.stats:
+            print(f"assembler: {assembler.lines} lines in {assembler.seconds:.6f}s "
+                  f"({assembler.throughput():.0f} lines/s), peak memory {peakMemory()}", file=sys.stderr)
+        sys.exit(0)
+    elif args.assemble:
+        ObjectFile.assemble(readProgram(args.program_file)).write(args.assemble)
+        sys.exit(0)
+    elif args.stream:
+        program = SourceFile(args.program_file)
+    elif args.no_cache or machine:
+        # cached objects are assembled for the default layout
+        program = readProgram(args.program_file)
+    else:
+        program = ObjectFile.cached(args.program_file)
+    if args.serve:
+        if not isinstance(program, ObjectFile):
+            program = ObjectFile.assemble(readProgram(args.program_file))
+        print(f"Serving {args.program_file} on port {args.serve}, Ctrl-C to stop")
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(serve(program, args.engine, port=args.serve))
+        sys.exit(0)
+    prog = engine(args.engine)(program, machine)
+    if args.buffered:
+        prog.output = devices.BufferedOutput()
+    if args.input:
+        prog.input = devices.LineInput(open(args.input))
+    if args.stats:
+        load_peak = peakMemory()
+    if args.profile:
+        from profiler import Profiler
+        prog.profiler = Profiler()
+    if args.pipeline is not None:
+        from pipeline import Pipeline
+        prog.pipeline = Pipeline.fromConfig(jsonArgument(args.pipeline)) if args.pipeline else Pipeline()
+    if args.caches is not None:
+        from cachesim import Cache, CacheModel
+        prog.caches = CacheModel.fromConfig(jsonArgument(args.caches)) if args.caches else CacheModel(Cache(), Cache())
+    if args.inputs:
+        import batch
+        inputs = jsonArgument(args.inputs)
+        results = []
+        for i, result in enumerate(prog.runInputs(inputs)):
+            result["program"] = args.program_file
+            results.append(result)
+            print(f"Input {i}: {json.dumps(result['input'])}")
+            sys.stdout.write(result["output"])
+            if result["error"]:
+                print(result["error"])
+        batch.writeReport(results, args.report)
+        failed = sum(1 for result in results if result["error"])
+        print(f"{len(results)} inputs, {failed} failed, report written to {args.report}")
+        sys.exit(1 if failed else 0)
+    if args.debug:
+        from debugger import Debugger, repl
+        repl(Debugger(prog))
+        sys.exit(0)
+    start = time.perf_counter()
+    try:
+        steps = prog.run()
+    finally:
+        if args.trace:
+            tracing.tracer.dump(args.trace)
+        if args.profile == "-":
+            sys.stderr.write(prog.profiler.table())
+        elif args.profile:
+            prog.profiler.dump(args.profile)
+        if args.pipeline is not None:
+            sys.stderr.write(prog.pipeline.table())
+        if args.caches is not None:
+            sys.stderr.write(prog.caches.table())
+    elapsed = time.perf_counter() - start
+    if args.stats:
+        if hasattr(prog, "assembler"):
+            print(f"assembler: {prog.assembler.lines} lines in {prog.assembler.seconds:.6f}s "
+                  f"({prog.assembler.throughput():.0f} lines/s)", file=sys.stderr)
+        print(f"load: peak memory {load_peak}", file=sys.stderr)
+        print(f"{args.engine}: {steps} instructions in {elapsed:.6f}s "
+              f"({steps / elapsed if elapsed else 0:.0f} instr/s)", file=sys.stderr)
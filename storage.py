@@ -1,9 +1,14 @@
-from convert import Precision, Length
-import copy
+from convert import Precision, Length, Word, Words
+from array import array
+import marshal
+import os
 
 class Storage:
 	def __init__(self, data={}):
-		self.data = copy.deepcopy(data)
+		self.data = dict(data)	# cells are immutable strings, a shallow copy is enough
+		self.hooks = []	# called with the address after every store, None after a reset
+		self.base = None	# latest snapshot and the addresses stored since, see snapshot()
+		self.dirty = None
 	def load(self, address, isCode=False):
 		if type(address)==type(str()) and len(address)==Length.precision:
 			address = Precision.spbin2dec(address)
@@ -18,12 +23,60 @@ class Storage:
 			self.data[address] = value
 		else:
 			self.data[address] = Precision.dec2spbin(value)
+		for hook in self.hooks:
+			hook(address)
+	def loadWord(self, address):
+		return Word.bin2word(self.load(address,isCode=True))
+	def storeWord(self, address, word):
+		self.store(address,Word.word2bin(word))
+	def storeWords(self, address, words):
+		for i,word in enumerate(words):
+			self.storeWord(address+i,word)
 	def setStorage(self,stolen):
 		for i in range(stolen):
-			try:
-				self.load(i)
-			except:
+			if i not in self.data:
 				self.store(i,0)
+	def image(self):
+		return dict(self.data)
+	def reset(self,image):
+		self.data = dict(image)
+		for hook in self.hooks:
+			hook(None)
+	def snapshot(self):
+		"""
+		Current cells as an image; stores are tracked from here on so that restore() of
+		this latest snapshot only rolls back the cells stored since (O(dirty)).
+		"""
+		if self.track not in self.hooks:
+			self.hooks.append(self.track)
+		self.base = self.image()
+		self.dirty = set()
+		return self.base
+	def track(self,address):
+		if address is None:
+			self.dirty = None
+		elif self.dirty is not None:
+			self.dirty.add(address)
+	def restore(self,snapshot):
+		if snapshot is not self.base or self.dirty is None:
+			# an older snapshot or a reset in between: restore everything
+			self.reset(snapshot)
+			self.base = snapshot
+			self.dirty = set()
+			return
+		dirty = self.dirty
+		self.rollback(dirty)
+		for hook in self.hooks:
+			if hook!=self.track:
+				for address in dirty:
+					hook(address)
+		self.dirty = set()
+	def rollback(self,dirty):
+		for address in dirty:
+			if address in self.base:
+				self.data[address] = self.base[address]
+			else:
+				self.data.pop(address,None)
 	def dispStorage(self):
 		for k,v in self.data.items():
 			print(f"{k}: {v} = {Precision.spbin2dec(v)}")
@@ -33,35 +86,425 @@ class Storage:
 			print(f"{key}: {v}")
 		except:
 			print(f"Address: {key} does not exists!")
+
+class WordSnapshot:
+	# fork point of a WordStorage: its length and, while it is the latest, the words stored over since
+	# (address -> old word, None past the length); older ones undo up to the next snapshot, or hold a
+	# full image once a reset replaced everything after them. undo None: no longer restorable
+	def __init__(self, length):
+		self.length = length
+		self.undo = {}
+		self.next = None
+		self.image = None
+
+class WordStorage(Storage):
+	# cells are kept as packed 32-bit words, addresses are the array indexes
+	def __init__(self, data={}, size=0):
+		self.data = array('I',[0])*size
+		self.hooks = []
+		self.live = None	# latest WordSnapshot, whose undo log stores fill in
+		for address,value in data.items():
+			self.store(address,value)
+	def load(self, address, isCode=False):
+		if type(address)==type(str()) and len(address)==Length.precision:
+			address = Precision.spbin2dec(address)
+		address = int(address)
+		if address<0 or address>=len(self.data):
+			raise KeyError(address)
+		if isCode:
+			return Word.word2bin(self.data[address])
+		return Word.word2dec(self.data[address])
+	def store(self,address,value):
+		if type(address)==type(str()) and len(address)==Length.precision:
+			address = Precision.spbin2dec(address)
+		address = int(address)
+		if address<0:
+			raise IndexError(f"Address: {address} is out of range")
+		if type(value)==type(str()):
+			value = Word.bin2word(value)
+		else:
+			value = Word.dec2word(value)
+		if address>=len(self.data):
+			self.setStorage(address+1)
+		if self.live is not None:
+			self.save(address)
+		self.data[address] = value
+		for hook in self.hooks:
+			hook(address)
+	def loadWord(self, address):
+		address = int(address)
+		if address<0 or address>=len(self.data):
+			raise KeyError(address)
+		return self.data[address]
+	def storeWord(self, address, word):
+		address = int(address)
+		if address<0:
+			raise IndexError(f"Address: {address} is out of range")
+		if address>=len(self.data):
+			self.setStorage(address+1)
+		if self.live is not None:
+			self.save(address)
+		self.data[address] = word
+		for hook in self.hooks:
+			hook(address)
+	def storeWords(self, address, words):
+		# bulk copy of packed words, e.g. straight from an object file
+		end = address+len(words)
+		if end>len(self.data):
+			self.setStorage(end)
+		if hasattr(words,"dtype"):
+			# NumPy words from Words.dec2words
+			words = array('I',words.astype("=u4").tobytes())
+		elif type(words)!=array:
+			words = array('I',words)
+		if self.live is not None:
+			for i in range(address,end):
+				self.save(i)
+		self.data[address:end] = words
+		for hook in self.hooks:
+			for i in range(address,end):
+				hook(i)
+	def setStorage(self,stolen):
+		if stolen>len(self.data):
+			self.data.extend(array('I',[0])*(stolen-len(self.data)))
+	def image(self):
+		return array('I',self.data)
+	def reset(self,image):
+		live = self.live
+		if live is not None:
+			# the undo log cannot follow a wholesale replace, so the latest snapshot keeps a copy instead
+			live.image = self.undone(self.image(),live)
+			live.undo = {}
+			self.live = None
+		self.data[:] = image
+		for hook in self.hooks:
+			hook(None)
+	def save(self, address):
+		# first store into address since the latest snapshot: keep the word it overwrites
+		undo = self.live.undo
+		if address not in undo:
+			undo[address] = self.data[address] if address<self.live.length else None
+	@staticmethod
+	def undone(words,snapshot):
+		for address,word in snapshot.undo.items():
+			if word is not None:
+				words[address] = word
+		del words[snapshot.length:]
+		return words
+	def snapshot(self):
+		"""
+		Fork point in O(1): stores from here on save the words they overwrite, so restore() only
+		writes back what was stored since (O(dirty)), like the pages of a PagedStorage.
+		"""
+		snapshot = WordSnapshot(len(self.data))
+		if self.live is not None:
+			self.live.next = snapshot
+		self.live = snapshot
+		return snapshot
+	def restore(self,snapshot):
+		# back to snapshot through the undo logs of it and every later snapshot, newest first
+		chain = []
+		while snapshot is not None and snapshot is not self.live and snapshot.image is None:
+			chain.append(snapshot)
+			snapshot = snapshot.next
+		if snapshot is None or snapshot.undo is None:
+			raise ValueError("snapshot was taken before a restore to an earlier one and cannot be restored")
+		if snapshot.image is not None:
+			self.data[:] = snapshot.image
+			for hook in self.hooks:
+				hook(None)
+		else:
+			chain.append(snapshot)
+		dirty = set()
+		for later in reversed(chain):
+			dirty.update(later.undo)
+			self.undone(self.data,later)
+		target = chain[0] if chain else snapshot
+		# snapshots after the target describe states that are gone now
+		later = target.next
+		while later is not None:
+			later.undo, later.image, later = None, None, later.next
+		target.undo, target.next, target.image = {}, None, None
+		self.live = target
+		for hook in self.hooks:
+			for address in dirty:
+				hook(address)
+	def state(self):
+		return self.data.tobytes()
+	def setState(self,state):
+		self.data = array('I',state)
+	def words(self, start=0, end=None):
+		return self.data[start:end]
+	def values(self, start=0, end=None):
+		# decoded cells start..end in one batch conversion
+		return [float(v) for v in Words.words2dec(self.words(start,end))]
+	def storeValues(self, address, values):
+		self.storeWords(address,Words.dec2words(values))
+	def dispStorage(self):
+		lines = zip(Words.words2bin(self.data),self.values())
+		print("\n".join(f"{k}: {b} = {v}" for k,(b,v) in enumerate(lines)))
+
+class PagedStorage(WordStorage):
+	# sparse word storage of up to size cells: pages of 2**pageBits words are allocated on the
+	# first store into them, cells of untouched pages read as word 0
+	def __init__(self, size=2**24, pageBits=12):
+		self.size = size
+		self.pageBits = pageBits
+		self.pageMask = (1<<pageBits)-1
+		self.pages = {}
+		self.shared = set()	# pages still owned by a snapshot, copied on the first store
+		self.hooks = []
+		self.base = None
+		self.dirty = None
+	def page(self, number):
+		# writable page: allocated on first use, copied when a snapshot still shares it
+		page = self.pages.get(number)
+		if page is None:
+			page = self.pages[number] = array('I',[0])*(1<<self.pageBits)
+		elif number in self.shared:
+			page = self.pages[number] = array('I',page)
+			self.shared.discard(number)
+		return page
+	def residentPages(self):
+		return len(self.pages)
+	def load(self, address, isCode=False):
+		if type(address)==type(str()) and len(address)==Length.precision:
+			address = Precision.spbin2dec(address)
+		if isCode:
+			return Word.word2bin(self.loadWord(address))
+		return Word.word2dec(self.loadWord(address))
+	def store(self,address,value):
+		if type(address)==type(str()) and len(address)==Length.precision:
+			address = Precision.spbin2dec(address)
+		if type(value)==type(str()):
+			value = Word.bin2word(value)
+		else:
+			value = Word.dec2word(value)
+		self.storeWord(address,value)
+	def loadWord(self, address):
+		address = int(address)
+		if address<0 or address>=self.size:
+			raise KeyError(address)
+		page = self.pages.get(address>>self.pageBits)
+		if page is None:
+			return 0
+		return page[address & self.pageMask]
+	def storeWord(self, address, word):
+		address = int(address)
+		if address<0 or address>=self.size:
+			raise IndexError(f"Address: {address} is out of range")
+		self.page(address>>self.pageBits)[address & self.pageMask] = word
+		for hook in self.hooks:
+			hook(address)
+	def storeWords(self, address, words):
+		end = address+len(words)
+		if address<0 or end>self.size:
+			raise IndexError(f"Addresses: {address} to {end-1} are out of range")
+		if hasattr(words,"dtype"):
+			words = array('I',words.astype("=u4").tobytes())
+		elif type(words)!=array:
+			words = array('I',words)
+		done = 0
+		while done<len(words):
+			offset = (address+done) & self.pageMask
+			count = min(len(words)-done,self.pageMask+1-offset)
+			self.page((address+done)>>self.pageBits)[offset:offset+count] = words[done:done+count]
+			done += count
+		for hook in self.hooks:
+			for i in range(address,end):
+				hook(i)
+	def setStorage(self,stolen):
+		# only widens the address space, pages stay unallocated
+		self.size = max(self.size,stolen)
+	def words(self, start=0, end=None):
+		# words start..end, by default up to the last resident page
+		if end is None:
+			end = (max(self.pages)+1)<<self.pageBits if self.pages else 0
+		result = array('I',[0])*max(end-start,0)
+		for number,page in self.pages.items():
+			first = max(number<<self.pageBits,start)
+			last = min((number+1)<<self.pageBits,end)
+			if first<last:
+				offset = number<<self.pageBits
+				result[first-start:last-start] = page[first-offset:last-offset]
+		return result
+	def image(self):
+		return {number: array('I',page) for number,page in self.pages.items()}
+	def reset(self,image):
+		self.pages = {number: array('I',page) for number,page in image.items()}
+		self.shared = set()
+		for hook in self.hooks:
+			hook(None)
+	def snapshot(self):
+		# pages are shared with the snapshot instead of copied
+		if self.track not in self.hooks:
+			self.hooks.append(self.track)
+		self.base = dict(self.pages)
+		self.shared = set(self.pages)
+		self.dirty = set()
+		return self.base
+	def restore(self,snapshot):
+		if snapshot is not self.base or self.dirty is None:
+			self.pages = dict(snapshot)
+			self.shared = set(snapshot)
+			self.base = snapshot
+			for hook in self.hooks:
+				hook(None)
+			self.dirty = set()
+			return
+		Storage.restore(self,snapshot)
+	def rollback(self,dirty):
+		for number in {address>>self.pageBits for address in dirty}:
+			if number in self.base:
+				self.pages[number] = self.base[number]
+				self.shared.add(number)
+			else:
+				self.pages.pop(number,None)
+	def state(self):
+		return {number: page.tobytes() for number,page in self.pages.items()}
+	def setState(self,state):
+		self.pages = {number: array('I',page) for number,page in state.items()}
+	def dispStorage(self):
+		# resident pages only
+		lines = []
+		for number in sorted(self.pages):
+			base = number<<self.pageBits
+			words = self.pages[number]
+			values = Words.words2dec(words)
+			lines += [f"{base+k}: {b} = {float(v)}" for k,(b,v) in enumerate(zip(Words.words2bin(words),values))]
+		print("\n".join(lines))
+
+class Layout:
+	# base addresses of the memory regions, each region ends where the next one starts;
+	# Layout() is the default 256-word map, keywords move single regions
+	regions = ["mbr","mapr","mspr","mcpr","mbpr","mvpr","mmpr"]
+	# regions named by 8-bit operand fields or the 8-bit stack registers; the arrays are only reached
+	# through array and index registers and may lie anywhere past the instructions
+	direct = ["mbr","mspr","mcpr","mbpr","mvpr","mmpr"]
+	def __init__(self, **bases):
+		unknown = set(bases)-set(Layout.regions)
+		if unknown:
+			raise ValueError(f"unknown memory regions: {', '.join(sorted(unknown))}")
+		for name in Layout.regions:
+			setattr(self,name,int(bases.get(name,globals()[name])))
+		direct = [getattr(self,name) for name in Layout.direct]
+		if direct!=sorted(direct) or self.mapr<self.mbr:
+			raise ValueError(f"memory regions must be in the order {', '.join(Layout.direct)}, with mapr past mbr")
+		if direct[-1]>=2**Length.opAddr:
+			raise ValueError(f"memory regions other than mapr must start below {2**Length.opAddr}")
 	@staticmethod
+	def scaled(mem_len):
+		# the default map with the arrays moved past the first 256 words when mem_len has room for them;
+		# variables, stack and the other directly addressed regions keep their 8-bit addresses
+		if mem_len<=globals()["mem_len"]:
+			return Layout()
+		return Layout(mapr=globals()["mem_len"])
+	def key(self):
+		return tuple(getattr(self,name) for name in Layout.regions)
+	def memoryList(self):
+		# initial values of the specialized registers BR to NMP
+		return [self.mbr,0,0,0,self.mbr,self.mbr,self.mspr,self.mspr,self.mcpr,self.mcpr,
+				self.mbpr,self.mbpr,self.mvpr,self.mvpr,self.mmpr,self.mmpr]
+
+class Machine:
+	# one simulated machine: its own variable, register and memory storages
+	def __init__(self, reg_len=32, mem_len=256, layout=None, paged=False):
+		# paged: sparse PagedStorage memory, for address spaces far beyond the 256-word default
+		self.layout = layout or Layout()
+		self.variable = Storage()
+		self.register = WordStorage()
+		self.memory = PagedStorage(mem_len) if paged else WordStorage()
+		key = (reg_len,mem_len,self.layout.key(),paged)
+		if not states:
+			loadStates()
+		if key in states:
+			self.setState(states[key])
+		else:
+			self.build(reg_len,mem_len)
+			states[key] = self.state()
+			saveStates()
+		self.data = [self.variable, self.register, self.memory]
+		self.initial = [storage.image() for storage in self.data]
+		self.symbols = {}	# labels and DEF names of the loaded program -> address, see setSymbols
+		self.resolveSlots()
+	def build(self, reg_len, mem_len):
+		initial = self.layout.memoryList()
+		for i in range(len(register_list)):
+			self.setVariable(self.register,register_list[i],br+i,initial[i])
+		self.setVariables("R",varpr,var_reglen)	# R1 to R7
+		self.setVariables("M",varpr,var_reglen)	# M1 to M7
+		self.setVariables("A",apr,array_reglen)	# A1 to A4
+		self.setVariables("I",apr+array_reglen,index_reglen)	# I1 to I2
+		self.register.setStorage(reg_len)
+		self.memory.setStorage(mem_len)
+	def state(self):
+		# variables and packed words serialized in one marshal blob
+		return marshal.dumps((self.variable.data,self.register.state(),self.memory.state()))
+	def setState(self,state):
+		variables, registers, memory = marshal.loads(state)
+		self.variable.data = variables
+		self.register.setState(registers)
+		self.memory.setState(memory)
+	def reset(self):
+		# back to the freshly built state, reusing the same storage objects
+		for storage,image in zip(self.data,self.initial):
+			storage.reset(image)
+		self.symbols = {}
+		self.resolveSlots()
+	def snapshot(self):
+		# copy-on-write fork point of variables, registers and memory; see Storage.snapshot
+		return tuple(storage.snapshot() for storage in self.data)
+	def restore(self,snapshot):
+		for storage,image in zip(self.data,snapshot):
+			storage.restore(image)
+	def registers(self):
+		# named register values, e.g. {"R1": 5.0, "PC": 12.0, ...}
+		return {name: self.register.load(slot) for name,slot in self.slots.items()}
+	def setSymbols(self,symbols):
+		# program symbols live apart from the register names, which an assembler's table also holds
+		self.symbols = {name: int(address) for name,address in symbols.items() if name not in self.slots}
+	def resolveSlots(self):
+		# register file: the fixed slot of every named register (R#, specialized, A#, I#)
+		# and of R<n> per operand number n, decoded from the variables once
+		self.slots = {name: int(Precision.spbin2dec(address)) for name,address in self.variable.data.items()}
+		self.operands = [self.slots.get(f"R{n}") for n in range(1<<Length.opAddr)]
+	def operandSlot(self,num):
+		slot = self.operands[num]
+		if slot is None:
+			raise KeyError(f"R{num}")
+		return slot
 	# predefined values
-	def setVariable(var,name,addr,value):
-		variable.store(name,addr)
+	def setVariable(self,var,name,addr,value):
+		self.variable.store(name,addr)
 		var.store(addr,value)
-	def setVariables(name,base,stolen=0):
+	def setVariables(self,name,base,stolen=0):
 		if len(name)>1:
 			stolen = len(name)
 		for i in range(stolen):
 			if len(name)>1:
-				variable.store(name[i],base+i)
+				self.variable.store(name[i],base+i)
 			else:
-				variable.store(name+str(i+1),base+i)
+				self.variable.store(name+str(i+1),base+i)
 	# temporary values
-	def setTmpVariable(name,addr,startswith="tmp_"):
-		data[0].store(startswith+name,addr)
-	def setTmpVariables(name_arr,addr_arr,startswith="tmp_"):
+	def setTmpVariable(self,name,addr,startswith="tmp_"):
+		self.variable.store(startswith+name,addr)
+	def setTmpVariables(self,name_arr,addr_arr,startswith="tmp_"):
 		for name,addr in zip(name_arr,addr_arr):
-			data[0].store(startswith+name,addr)
-	def removeVariables(startsWith="tmp_"):
-		data[0] = {key: value for key, value in variable.items() if not key.startswith(startsWith)}
-	def removeVariable(name,startsWith="tmp_"):
-		data[0].pop(startsWith+name)
-			
-memory = Storage()
-register = Storage()
+			self.variable.store(startswith+name,addr)
+	def removeVariables(self,startsWith="tmp_"):
+		self.variable.data = {key: value for key, value in self.variable.data.items() if not key.startswith(startsWith)}
+	def removeVariable(self,name,startsWith="tmp_"):
+		self.variable.data.pop(startsWith+name)
+	def display(self,toShowStr):
+		toShow = [c=='1' for c in toShowStr]
+		label = ["Variable", "Register", "Memory"]
+		for i,show in enumerate(toShow):
+			if show:
+				print(label[i])
+				self.data[i].dispStorage()
+
 # R#, A#, I#, others
 register_list = ["BR","DR1","DR2","FR","IR","PC","SPR","TSP","CPR","NCP","BPR","NBP","VPR","NVP","MPR","NMP"]
-variable = Storage()
 #Registers
 br = 8	# acc = 9; ir = 12;
 		# pc = 13; spr = 14; cpr = 16;
@@ -75,54 +518,79 @@ mbpr = 168
 mvpr = 200
 mmpr = 216
 memory_list = [mbr,0,0,0,mbr,mbr,mspr,mspr,mcpr,mcpr,mbpr,mbpr,mvpr,mvpr,mmpr,mmpr]
-for i in range(len(register_list)):
-	Storage.setVariable(register,register_list[i],br+i,memory_list[i])
-# Storage.setVariable(register,"BR",br,mbr)
-# Storage.setVariable(register,"DR1",br+1,0)
-# Storage.setVariable(register,"DR2",br+2,0)
-# Storage.setVariable(register,"FR",br+3,0)
-# Storage.setVariable(register,"IR",br+4,mbr)
-# Storage.setVariable(register,"PC",br+5,mbr)
-# Storage.setVariable(register,"SPR",br+6,mspr)
-# Storage.setVariable(register,"TSP",br+7,mspr)
-# Storage.setVariable(register,"CPR",br+8,mcpr)
-# Storage.setVariable(register,"NCP",br+9,mcpr+1)
-# Storage.setVariable(register,"BPR",br+10,mbpr)
-# Storage.setVariable(register,"NBP",br+11,mbpr+1)
-# Storage.setVariable(register,"VPR",br+12,mvpr)
-# Storage.setVariable(register,"NVP",br+13,mvpr+1)
-# Storage.setVariable(register,"MPR",br+14,mmpr)
-# Storage.setVariable(register,"NMP",br+15,mmpr+1)
 varpr = 1
 var_reglen = 7
-Storage.setVariables("R",varpr,var_reglen)	# R1 to R7
-Storage.setVariables("M",varpr,var_reglen)	# M1 to M7
 apr = 24
 array_reglen = 4
 index_reglen = 2
-Storage.setVariables("A",apr,array_reglen)	# A1 to A4
-Storage.setVariables("I",apr+array_reglen,index_reglen)	# I1 to I2
 reg_len = 32
-register.setStorage(reg_len)
 mem_len = 256
-memory.setStorage(mem_len)
-data = [variable, register, memory]
-#printing the specified list
-toShowStr = "000"
-toShow = [c=='1' for c in toShowStr]
-label = ["Variable", "Register", "Memory"]
-for i,show in enumerate(toShow):
-	if show:
-		print(label[i])
-		data[i].dispStorage()
+# serialized initial state per machine configuration; the first Machine of each builds it. Only when
+# ISA_STATE_CACHE names a file are the states also kept there for later processes
+states = {}
+stateFile = os.environ.get("ISA_STATE_CACHE") or None
+STATE_VERSION = 1
+
+def stateStamp():
+	# saved states only hold for the sources that built them and this marshal format
+	import convert
+	return (STATE_VERSION,marshal.version)+tuple((os.stat(path).st_mtime_ns,os.stat(path).st_size) for path in (__file__,convert.__file__))
+
+def savedStates():
+	# states in stateFile, empty when there is none or it was built from other sources
+	if stateFile is None:
+		return {}
+	try:
+		with open(stateFile,"rb") as f:
+			stamp, saved = marshal.load(f)
+	except (OSError,EOFError,ValueError,TypeError):
+		return {}
+	return saved if stamp==stateStamp() else {}
+
+def loadStates():
+	states.update(savedStates())
+
+def saveStates():
+	# merged with what other processes saved meanwhile, written aside and renamed, as object files are;
+	# an unwritable file only costs the next process a build
+	if stateFile is None:
+		return
+	states.update({key: state for key,state in savedStates().items() if key not in states})
+	temp = f"{stateFile}.{os.getpid()}.tmp"
+	try:
+		with open(temp,"wb") as f:
+			marshal.dump((stateStamp(),states),f)
+		os.replace(temp,stateFile)
+	except OSError:
+		if os.path.exists(temp):
+			os.remove(temp)
+
+def __getattr__(name):
+	# default machine, used wherever no machine is passed explicitly; built on first use
+	if name in ("machine","variable","register","memory","data"):
+		global machine, variable, register, memory, data
+		machine = Machine(reg_len,mem_len)
+		variable = machine.variable
+		register = machine.register
+		memory = machine.memory
+		data = machine.data
+		return globals()[name]
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 """
+Machine			Owns one Variable, Register and Memory storage; Program, Instruction, Access and AddressingMode
+				take a machine argument and fall back to the default storage.machine, which is only
+				built when first used. Machines of the same size start from one serialized state, which
+				later processes load from the file named by ISA_STATE_CACHE, when it is set.
 Storages:
 Variable		Storage for special values in register and memory (variables, blocks, specialialized registers,etc.)
 						-	Contains 32-bit Precision binary format (accurate upto 2^16 or 65536 for at most 2 decimal places)
 Memory			Storage that mimics the computer memory with 256 slots (contains 32-bit instruction, 32-bit Precision values)
 Registers		Storage that mimics the computer register with 32 slots (contains only 32-bit Precision values)
+						-	Memory and Registers are WordStorage: cells are packed 32-bit words in an array('I'),
+							decoded with the bit-level Word codec instead of 32-character strings
 
-Memmory:
+Memmory:			(default Layout; Layout(mvpr=...) moves regions, Layout.scaled(n) moves the arrays to 256 and up,
+					and Machine(mem_len=2**24, paged=True) backs memory with a sparse PagedStorage)
 1-7 	GPM							(M#)
 8-71 	Instructions				(Y)
 72-111 	Arrays						(X)
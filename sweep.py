@@ -0,0 +1,131 @@
+"""
+Round-trip accuracy sweep of the Precision codec.
+
+    python sweep.py                          every value i + j/100 for i < 2**16
+    python sweep.py --max-e 12 --jobs 4      a smaller range on four processes
+
+Each value k is encoded to a word and decoded again; k counts as an error when the
+decoded value differs. The integer range is split into chunks over a process pool and
+every finished chunk is appended to a checkpoint file, so an interrupted sweep resumes
+where it stopped. The checkpoint is discarded when the settings or the Length layout change.
+"""
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from convert import Length, Words
+
+
+def settings(max_e, dec, chunk, round_fake):
+    return {"whole": Length.whole, "precision": Length.precision, "dec_place": Length.dec_place,
+            "max_e": max_e, "dec": dec, "chunk": chunk, "round": round_fake}
+
+
+def sweepChunk(start, end, dec, round_fake=False):
+    """
+    Errors for the values start <= k < end with dec decimal places, as (k, decoded) pairs.
+    """
+    scale = 10**dec
+    values = [round(i + j * 1.0 / scale, dec) for i in range(start, end) for j in range(scale)]
+    decoded = Words.words2dec(Words.dec2words(values))
+    errors = []
+    for k, fake_k in zip(values, decoded):
+        fake_k = float(fake_k)
+        if round_fake:
+            fake_k = round(fake_k, dec)
+        if k != fake_k:
+            errors.append((k, fake_k))
+    return start, errors
+
+
+def readCheckpoint(filename, config):
+    """
+    Finished chunks {start: errors} of a checkpoint written with the same settings.
+    """
+    done = {}
+    if not os.path.exists(filename):
+        return done
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    try:
+        if not lines or json.loads(lines[0]) != config:
+            return done
+    except ValueError:
+        return done
+    for line in lines[1:]:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            break   # partly written last line of an interrupted run
+        done[entry["start"]] = [tuple(error) for error in entry["errors"]]
+    return done
+
+
+def sweep(max_e=16, dec=2, chunk=256, jobs=None, checkpoint="sweep.ckpt", round_fake=False, progress=None):
+    """
+    Runs (or resumes) the sweep over 0 <= k < 2**max_e; returns all errors sorted by value.
+    """
+    config = settings(max_e, dec, chunk, round_fake)
+    done = readCheckpoint(checkpoint, config) if checkpoint else {}
+    starts = [start for start in range(0, 2**max_e, chunk) if start not in done]
+    out = None
+    if checkpoint:
+        # rewritten from what was read, which drops a torn last line before new chunks follow it
+        out = open(checkpoint, "w")
+        out.write(json.dumps(config) + "\n")
+        for start, errors in done.items():
+            out.write(json.dumps({"start": start, "errors": errors}) + "\n")
+        out.flush()
+    jobs = jobs or os.cpu_count() or 1
+    total = len(range(0, 2**max_e, chunk))
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending = set()
+            starts.reverse()
+            while starts or pending:
+                # a few chunks per worker in flight, so checkpoints follow the progress closely
+                while starts and len(pending) < 4 * jobs:
+                    start = starts.pop()
+                    pending.add(pool.submit(sweepChunk, start, min(start + chunk, 2**max_e), dec, round_fake))
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    start, errors = future.result()
+                    done[start] = errors
+                    if out:
+                        out.write(json.dumps({"start": start, "errors": errors}) + "\n")
+                        out.flush()
+                    if progress:
+                        progress(len(done), total)
+    finally:
+        if out:
+            out.close()
+    return sorted(error for errors in done.values() for error in errors)
+
+
+def writeErrors(errors, filename):
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["value", "decoded"])
+        writer.writerows(errors)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Round-trip accuracy sweep of the Precision codec")
+    parser.add_argument("--max-e", type=int, default=16, help="sweep 0 <= k < 2**MAX_E (default 16)")
+    parser.add_argument("--dec", type=int, default=Length.dec_place, help="decimal places per value")
+    parser.add_argument("--chunk", type=int, default=256, help="integer parts per task (default 256)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--checkpoint", default="sweep.ckpt", help="checkpoint file (default sweep.ckpt)")
+    parser.add_argument("--errors", default="sweep_errors.csv", help="error table (default sweep_errors.csv)")
+    parser.add_argument("--round", action="store_true", help="round decoded values to --dec places first")
+    args = parser.parse_args()
+    def progress(finished, total):
+        print(f"\r{finished}/{total} chunks", end="", flush=True)
+    errors = sweep(args.max_e, args.dec, args.chunk, args.jobs, args.checkpoint, args.round, progress)
+    print()
+    writeErrors(errors, args.errors)
+    max_num = 2**args.max_e
+    total_num = max_num * 10**args.dec
+    print(f"From 0 to {max_num}, for {args.dec} decimal places:")
+    print(f"{len(errors)} errors out of {total_num} ({round(len(errors) / total_num * 100, args.max_e // 5)}%)")
@@ -0,0 +1,43 @@
+import pytest
+import storage
+from assembler import Assembler, AssemblyError, IncrementalAssembler
+
+undefined = [
+    ["MOV R1 #1", "MOV R1 nowhere", "EOP"],
+    ["MOV R1 #1", "ADD R1 &nowhere", "EOP"],
+    ["MOV R1 #1", "MOV R2 nowhere[I1]", "EOP"],
+    ["MOV R1 #1", "JMP nowhere", "EOP"],
+]
+
+
+def assemblers():
+    machine = storage.Machine()
+    return [Assembler(machine), Assembler(machine, optimize=True), IncrementalAssembler(machine)]
+
+
+@pytest.mark.parametrize("source", undefined, ids=[source[1] for source in undefined])
+def test_undefined_symbol_is_an_error(source):
+    for assembler in assemblers():
+        with pytest.raises(AssemblyError) as error:
+            assembler.assemble(source)
+        assert error.value.lineno == 2 and "nowhere" in error.value.msg
+
+
+@pytest.mark.parametrize("source", undefined, ids=[source[1] for source in undefined])
+def test_undefined_symbol_is_an_error_when_streaming(source, tmp_path):
+    machine = storage.Machine()
+    with pytest.raises(AssemblyError) as error:
+        Assembler(machine).streamInto(source)
+    assert error.value.lineno == 2
+    with pytest.raises(AssemblyError):
+        Assembler(machine).streamObject(source, str(tmp_path / "out.obj"))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_forward_references_resolve():
+    source = ["JMP end", "MOV R1 x", "end: PRNT R1", "DEF x 3", "EOP"]
+    machine = storage.Machine()
+    code = Assembler(machine).assemble(source).code
+    streamed = Assembler(storage.Machine())
+    count = streamed.streamInto(source)
+    assert streamed.machine.memory.words(0, count) == code
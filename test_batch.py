@@ -0,0 +1,70 @@
+import csv
+import json
+import pytest
+import batch
+
+sources = {
+    "good.txt": ["MOV R1 #5", "ADD R1 #2", "PRNT R1", "EOP"],
+    "bad.txt": ["MOV R1 #5", "FOO R1", "EOP"],
+    "underflow.txt": ["MOV R1 #5", "POP R2", "EOP"],
+}
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "worker", {})
+    for name, lines in sources.items():
+        (tmp_path / name).write_text("\n".join(lines) + "\n")
+    (tmp_path / "notes.md").write_text("not a program\n")
+    return batch.programFiles(str(tmp_path))
+
+
+def check(results, files):
+    assert [result["program"] for result in results] == files
+    bad, good, underflow = results
+    assert good["error"] is None
+    assert good["output"] == "Printing: 7.0\nEnd of program\n"
+    assert good["registers"]["R1"] == 7.0 and good["instructions"] == 5
+    assert bad["error"].startswith("AssemblyError: line 2") and bad["instructions"] is None
+    assert underflow["error"] == "RuntimeError: Stack underflow"
+
+
+def test_program_files(files, tmp_path):
+    assert [name.rsplit("/", 1)[1] for name in files] == ["bad.txt", "good.txt", "underflow.txt"]
+    assert batch.programFiles(str(tmp_path / "g*.txt")) == [files[1]]
+
+
+def test_errors_stay_with_their_file(files):
+    # one warm worker runs them all; the failed runs leave nothing behind for the next
+    batch.initWorker("block")
+    check([batch.runFile(filename) for filename in files], files)
+    assert batch.runFile(files[1])["output"] == "Printing: 7.0\nEnd of program\n"
+
+
+@pytest.mark.parametrize("engine_name", ["interp", "threaded", "block"])
+def test_batch_on_a_process_pool(files, engine_name):
+    check(batch.runBatch(files, engine_name, jobs=2), files)
+
+
+def test_optimized_batch_reports_the_optimizer(files):
+    results = batch.runBatch(files, jobs=1, optimize=True)
+    check(results, files)
+    assert results[1]["optimizer"] is not None and results[0]["optimizer"] is None
+
+
+def test_reports(files, tmp_path):
+    batch.initWorker()
+    results = [batch.runFile(filename) for filename in files]
+    batch.writeReport(results, str(tmp_path / "report.json"))
+    with open(tmp_path / "report.json") as f:
+        assert json.load(f) == results
+    batch.writeReport(results, str(tmp_path / "report.csv"))
+    with open(tmp_path / "report.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["program"] for row in rows] == files
+    bad, good, underflow = rows
+    assert good["error"] == "" and good["instructions"] == "5" and good["R1"] == "7.0"
+    assert good["output"] == "Printing: 7.0\nEnd of program\n"
+    # a run that failed before it finished has no registers to fill its columns
+    assert bad["error"] == results[0]["error"] and bad["R1"] == "" and bad["instructions"] == ""
+    assert underflow["error"] == "RuntimeError: Stack underflow"
@@ -0,0 +1,60 @@
+import io
+import pytest
+import storage
+from cachesim import Cache, CacheModel
+from run import engine
+
+
+def accessed(cache, addresses):
+    return [cache.access(address) for address in addresses], dict(cache.misses)
+
+
+def test_lines_hit_after_their_first_word():
+    cache = Cache(8, 4, 1)
+    assert accessed(cache, [0, 1, 2, 3, 4]) == ([False, True, True, True, False],
+                                                {("fetch", "compulsory"): 2})
+    assert cache.report()["hits"] == 3 and cache.report()["hit_rate"] == 3 / 5
+
+
+def test_three_c_split():
+    # direct mapped, 8 one-word lines: 0 and 8 share a set although the cache could hold both
+    cache = Cache(8, 1, 1)
+    accessed(cache, [0, 8, 0, 8])
+    assert cache.misses == {("fetch", "compulsory"): 2, ("fetch", "conflict"): 2}
+    # nine lines cycle through an eight-line cache, so 0 is gone whatever the mapping
+    cache = Cache(8, 1, 1)
+    accessed(cache, list(range(9)) + [0])
+    assert cache.misses == {("fetch", "compulsory"): 9, ("fetch", "capacity"): 1}
+    assert cache.report()["misses"] == {"compulsory": 9, "capacity": 1}
+
+
+def test_replacement_policies():
+    pattern = [0, 1, 0, 2, 0]
+    assert accessed(Cache(2, 1, 2, "lru"), pattern)[0] == [False, False, True, False, True]
+    # fifo evicts 0, the oldest fill, although it was just used
+    fifo = Cache(2, 1, 2, "fifo")
+    assert accessed(fifo, pattern) == ([False, False, True, False, False],
+                                       {("fetch", "compulsory"): 3, ("fetch", "conflict"): 1})
+    with pytest.raises(ValueError):
+        Cache(policy="mru")
+    with pytest.raises(ValueError):
+        Cache(12, 4, 2)
+
+
+@pytest.mark.parametrize("engine_name", ["interp", "threaded", "block"])
+def test_model_counts_fetches_and_data_by_mode(engine_name):
+    source = ["MOV R3 #0", "MOV R1 72[I1]", "PUSH R1", "POP R2", "ADD R2 72[I1]", "EOP"]
+    program = engine(engine_name)(source, storage.Machine())
+    program.output = io.StringIO()
+    program.caches = CacheModel(Cache(8, 2, 1), Cache(8, 1, 2))
+    steps = program.run()
+    report = program.caches.report()
+    # the first instruction runs twice, so fetches go 0, 0, 1, ..., 5: one miss per two-word line
+    icache = report["icache"]
+    assert (icache["accesses"], icache["hits"], icache["misses"]) == (steps, 4, {"compulsory": 3})
+    # 72[I1] is loaded twice, the stack top is stored by PUSH and loaded by POP
+    modes = report["dcache"]["modes"]
+    assert modes == {kind: {"accesses": 2, "hits": 1, "hit_rate": 0.5, "misses": {"compulsory": 1}}
+                     for kind in ("indexed", "stack")}
+    # the memory methods are put back once the run is over
+    assert "load" not in vars(program.machine.memory)
@@ -0,0 +1,93 @@
+import math
+import pytest
+import convert
+from convert import Word, Words
+
+bias = 127
+flen = 23
+
+
+def referenceWord(value):
+    # sign | exponent + bias | fraction truncated to 23 bits, from the value's binary exponent
+    if value == 0:
+        return 0
+    mantissa, exponent = math.frexp(abs(value))
+    e = exponent - 1 + bias
+    if not 0 <= e <= 255:
+        raise OverflowError(value)
+    return (value < 0) << 31 | e << flen | int((2 * mantissa - 1) * 2**flen)
+
+
+def referenceValue(word):
+    # the exact value (1 + fraction) * 2**(exponent - bias), rounded to 2 decimals like round()
+    value = round(math.ldexp(word & (1 << flen) - 1 | 1 << flen, (word >> flen & 255) - bias - flen), 2)
+    return -value if word >> 31 else value
+
+
+largest = math.ldexp(2**24 - 1, 255 - bias - flen)    # every exponent and fraction bit set
+smallest = math.ldexp(1, -bias)                        # exponent field 0, fraction 0
+values = [1.0, -1.0, 0.5, 0.1, -0.1, 0.01, 0.005, 1.005, 2.675, 10.0, 255.0, 65535.99, -12345.67, 1e-30,
+          1e30, 3.4e38, largest, -largest, smallest, -smallest, smallest * 1.5, 2.0**127]
+words = [0, 1, 0x007FFFFF, 0x80000000, 0x80000001, 0x7FFFFFFF, 0xFFFFFFFF, 0x3F800000, 0xBF800000,
+         Word.dec2word(0.125), Word.dec2word(0.375), Word.dec2word(-0.625), Word.dec2word(1.125),
+         Word.dec2word(2.5), Word.dec2word(1e-3), Word.dec2word(0.015625)]
+outOfRange = [math.ldexp(1, -bias - 1), 5e-324, 2.2250738585072014e-308, math.ldexp(1, 129), -math.ldexp(1, 129),
+              1e300]
+
+
+def signed(value):
+    # negative zero compares equal to zero, so the sign is compared as well
+    return value, math.copysign(1.0, value)
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if convert.np is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(convert, "np", None)
+    return request.param
+
+
+def test_word_matches_reference():
+    for value in values:
+        assert Word.dec2word(value) == referenceWord(value), value
+    for word in words:
+        assert signed(Word.word2dec(word)) == signed(referenceValue(word)), hex(word)
+
+
+def test_zero_and_negative_zero():
+    assert Word.dec2word(0.0) == Word.dec2word(-0.0) == 0
+    assert signed(Word.word2dec(0x80000000)) == (0.0, -1.0)
+
+
+def test_extremes():
+    assert Word.dec2word(largest) == 0x7FFFFFFF
+    assert Word.dec2word(smallest) == 0
+    assert Word.dec2word(-smallest) == 0x80000000
+
+
+def test_rounding_half_to_even():
+    assert Word.word2dec(Word.dec2word(0.125)) == 0.12
+    assert Word.word2dec(Word.dec2word(0.375)) == 0.38
+    assert Word.word2dec(Word.dec2word(-0.625)) == -0.62
+
+
+def test_out_of_range():
+    for value in outOfRange:
+        with pytest.raises(OverflowError):
+            Word.dec2word(value)
+
+
+def test_words_match_reference(backend):
+    assert [int(word) for word in Words.dec2words(values)] == [referenceWord(value) for value in values]
+    assert [signed(float(value)) for value in Words.words2dec(words)] == \
+           [signed(referenceValue(word)) for word in words]
+    assert list(Words.words2bin(words)) == [format(word, "032b") for word in words]
+
+
+def test_words_out_of_range(backend):
+    for value in outOfRange:
+        with pytest.raises(OverflowError):
+            Words.dec2words([1.0, value])
@@ -0,0 +1,95 @@
+import io
+import pytest
+import storage
+from debugger import Debugger
+from run import engine
+
+engines = ["interp", "threaded", "block"]
+source = ["MOV R1 #5", "MOV R2 #12", "PUSH R2", "ADD R1 R2", "SUB R2 #2", "PRNT R1", "PRNT R2", "EOP"]
+expected = "Printing: 17.0\nPrinting: 10.0\nEnd of program\n"
+
+
+@pytest.fixture(params=engines)
+def debugged(request):
+    machine = storage.Machine()
+    program = engine(request.param)(source, machine)
+    program.output = io.StringIO()
+    return Debugger(program), machine, program.output
+
+
+def registers(machine):
+    found = machine.registers()
+    return found["R1"], found["R2"]
+
+
+def test_breakpoint(debugged):
+    debugger, machine, out = debugged
+    debugger.breakAt(3)
+    assert debugger.cont() == "breakpoint"
+    assert debugger.pc == 3
+    assert registers(machine) == (5.0, 12.0)
+    assert debugger.finish() == "halt"
+    assert out.getvalue() == expected
+
+
+def test_register_watchpoint(debugged):
+    debugger, machine, out = debugged
+    debugger.watchRegister("R2")
+    assert debugger.cont() == "watchpoint"
+    # the hit reports after the storing instruction, before the next one
+    assert debugger.hits == [(1, "register", "R2", 0.0, 12.0)]
+    assert debugger.pc == 2
+    assert debugger.cont() == "watchpoint"
+    assert debugger.hits[-1] == (4, "register", "R2", 12.0, 10.0)
+    assert debugger.cont() == "halt"
+    assert out.getvalue() == expected
+
+
+def test_memory_watchpoint(debugged):
+    debugger, machine, out = debugged
+    top = int(machine.register.load(machine.slots["TSP"])) + 1
+    debugger.watchMemory(top)
+    assert debugger.cont() == "watchpoint"
+    assert debugger.hits == [(2, "memory", top, 0.0, 12.0)]
+    assert debugger.finish() == "halt"
+
+
+def test_step(debugged):
+    debugger, machine, out = debugged
+    assert debugger.step() == "step"
+    first = debugger.pc
+    assert debugger.step(2) == "step"
+    assert debugger.pc == first + 2
+    assert out.getvalue() == ""
+    assert debugger.finish() == "halt"
+    assert out.getvalue() == expected
+
+
+def test_run_to_cursor(debugged):
+    debugger, machine, out = debugged
+    assert debugger.runTo(5) == "cursor"
+    assert debugger.pc == 5
+    assert registers(machine) == (17.0, 10.0)
+    assert out.getvalue() == ""
+    assert debugger.runTo(7) == "cursor"
+    assert out.getvalue() == "Printing: 17.0\nPrinting: 10.0\n"
+
+
+def test_finish_runs_the_rest(debugged):
+    debugger, machine, out = debugged
+    debugger.breakAt(4)
+    debugger.cont()
+    assert debugger.finish() == "halt"
+    assert debugger.finished and debugger.program.debugger is None
+    assert out.getvalue() == expected
+    assert registers(machine) == (17.0, 10.0)
+
+
+def test_run_refuses_while_attached(debugged):
+    debugger, machine, out = debugged
+    debugger.breakAt(3)
+    debugger.cont()
+    with pytest.raises(RuntimeError):
+        debugger.program.run(resume=True)
+    assert debugger.finish() == "halt"
+    assert out.getvalue() == expected
@@ -0,0 +1,56 @@
+import random
+import storage
+from assembler import Assembler
+from decode import DecodeCache, decode
+from run import readProgram
+
+
+def loaded(source):
+    machine = storage.Machine()
+    code = Assembler(machine).assemble(source).load(machine)
+    return machine, code
+
+
+def fields(word):
+    # the instruction layout read off the binary string: opcode, mode, addr, mode, addr, extra
+    bits = format(word, "032b")
+    return tuple(int(bits[start:end], 2) for start, end in ((0, 5), (5, 8), (8, 16), (16, 19), (19, 27), (27, 32)))
+
+
+def test_decode_matches_the_instruction_layout():
+    rng = random.Random(2)
+    for word in [rng.getrandbits(32) for i in range(2000)] + [1, 2**32 - 1]:
+        decoded = decode(word)
+        assert (decoded.code, decoded.mode1, decoded.addr1, decoded.mode2, decoded.addr2, decoded.extra) == fields(word)
+    assert decode(0) is None
+
+
+def test_cached_and_uncached_decode_agree():
+    machine, code = loaded(readProgram("testprog.txt") + ["PUSH R1", "POP R2", "MOV R3 A1[I1]", "EOP"])
+    cache = DecodeCache.of(machine.memory)
+    for address in range(len(code) + 2):
+        expected = decode(machine.memory.loadWord(address))
+        assert cache.fetch(address) == expected
+        # the second fetch comes from the cache
+        assert cache.fetch(address) == expected
+
+
+def test_store_into_code_invalidates_the_cached_decode():
+    machine, code = loaded(["MOV R1 #5", "ADD R1 #2", "PRNT R1", "EOP"])
+    cache = DecodeCache.of(machine.memory)
+    assert cache.fetch(1).name == "ADD"
+    machine.memory.storeWord(1, code[2])
+    assert cache.fetch(1).name == "PRNT"
+    machine.memory.storeWords(1, [code[0]])
+    assert cache.fetch(1).name == "MOV"
+    machine.memory.store(1, 0)
+    assert cache.fetch(1) is None
+
+
+def test_reset_drops_every_cached_decode():
+    machine, code = loaded(["MOV R1 #5", "EOP"])
+    cache = DecodeCache.of(machine.memory)
+    assert cache.fetch(0).name == "MOV"
+    machine.reset()
+    assert cache.entries == {}
+    assert cache.fetch(0) is None
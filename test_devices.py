@@ -0,0 +1,159 @@
+import asyncio
+import io
+import pytest
+import storage
+from devices import BufferedOutput, Console, LineInput, ListInput, StreamInput, StreamOutput
+from run import engine
+
+engines = ["interp", "threaded", "block"]
+# the first instruction runs twice, as the fetch loop always has, so it is not a SCAN
+source = ["MOV R3 #1", "SCAN R1", "SCAN R2", "ADD R1 R2", "PRNT R1", "EOP"]
+expected = "Printing: 5.5\nEnd of program\n"
+
+
+def program(engine_name="interp", input=None):
+    program = engine(engine_name)(source, storage.Machine())
+    program.output = io.StringIO()
+    if input is not None:
+        program.input = input
+    return program
+
+
+class Writer:
+    # the parts of an asyncio StreamWriter that StreamOutput uses
+    def __init__(self):
+        self.data = b""
+        self.drains = 0
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        self.drains += 1
+
+
+def test_console_writes_to_stdout(capsys):
+    console = Console()
+    console.write("one\n")
+    console.flush()
+    assert capsys.readouterr().out == "one\n"
+
+
+def test_buffered_output_writes_in_bulk():
+    stream = io.StringIO()
+    output = BufferedOutput(stream, size=8)
+    output.write("abc")
+    output.write("def")
+    assert stream.getvalue() == ""
+    output.write("gh")
+    assert stream.getvalue() == "abcdefgh"
+    output.write("i")
+    output.flush()
+    assert stream.getvalue() == "abcdefghi" and output.pending == 0
+
+
+def test_buffered_output_follows_redirected_stdout(capsys):
+    output = BufferedOutput()
+    output.write("later\n")
+    assert capsys.readouterr().out == ""
+    output.flush()
+    assert capsys.readouterr().out == "later\n"
+
+
+def test_line_and_list_inputs():
+    lines = LineInput(io.StringIO("1\n2.5\n"))
+    assert [lines.readline(), lines.readline(), lines.readline()] == ["1\n", "2.5\n", None]
+    values = ListInput([3, "4.5"])
+    assert [values.readline(), values.readline(), values.readline()] == ["3", "4.5", None]
+    assert asyncio.run(LineInput(io.StringIO("7\n")).readlineAsync()) == "7\n"
+    assert asyncio.run(ListInput([8]).readlineAsync()) == "8"
+
+
+def test_stream_input_reads_only_asynchronously():
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"1.5\n")
+        reader.feed_eof()
+        stream = StreamInput(reader)
+        return [await stream.readlineAsync(), await stream.readlineAsync()]
+
+    assert asyncio.run(read()) == ["1.5\n", None]
+    with pytest.raises(RuntimeError):
+        StreamInput(None).readline()
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_scan_reads_the_input_device(engine_name):
+    scanned = program(engine_name, ListInput([2, 3.5]))
+    scanned.run()
+    assert scanned.output.getvalue() == expected
+    scanned = program(engine_name, LineInput(io.StringIO("2\n3.5\n")))
+    scanned.run()
+    assert scanned.output.getvalue() == expected
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_scan_errors(engine_name):
+    with pytest.raises(EOFError):
+        program(engine_name, ListInput([2])).run()
+    with pytest.raises(ValueError):
+        program(engine_name, ListInput([2, "x"])).run()
+
+
+def test_run_async_with_list_input():
+    scanned = program(input=ListInput([2, 3.5]))
+    steps = asyncio.run(scanned.runAsync())
+    assert scanned.output.getvalue() == expected
+    reference = program(input=ListInput([2, 3.5]))
+    assert steps == reference.run()
+
+
+def test_run_async_waits_on_stream_input_and_drains_output():
+    async def session():
+        reader = asyncio.StreamReader()
+        writer = Writer()
+        scanned = program(input=StreamInput(reader))
+        scanned.output = StreamOutput(writer)
+        task = asyncio.ensure_future(scanned.runAsync(slice=1))
+        # the program waits at the first SCAN until a line arrives
+        for i in range(5):
+            await asyncio.sleep(0)
+        assert not task.done()
+        reader.feed_data(b"2\n3.5\n")
+        await asyncio.wait_for(task, 5)
+        return writer
+
+    writer = asyncio.run(session())
+    assert writer.data.decode() == expected
+    assert writer.drains > 0
+
+
+def test_run_async_ends_at_stream_eof():
+    async def session():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"2\n")
+        reader.feed_eof()
+        await program(input=StreamInput(reader)).runAsync()
+
+    with pytest.raises(EOFError):
+        asyncio.run(session())
+
+
+def test_run_async_shares_the_event_loop():
+    looping = program(input=ListInput([2, 3.5]))
+
+    async def both():
+        turns = []
+
+        async def ticker():
+            while not task.done():
+                turns.append(len(looping.output.getvalue()))
+                await asyncio.sleep(0)
+
+        task = asyncio.ensure_future(looping.runAsync(slice=1))
+        await asyncio.gather(task, ticker())
+        return turns
+
+    turns = asyncio.run(both())
+    # with slices of one instruction the ticker gets a turn before the program prints anything
+    assert len(turns) >= len(source) and turns[0] == 0
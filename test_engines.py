@@ -0,0 +1,66 @@
+import io
+import random
+import pytest
+import storage
+from run import engine, readProgram
+
+engines = ["threaded", "block"]
+
+programs = {
+    "testprog": readProgram("testprog.txt"),
+    "arithmetic": ["MOV R1 #5", "MOV R2 #7", "ADD R1 R2", "MUL R1 #3", "DIV R1 #4", "MOD R2 #4", "SUB R3 R1",
+                   "PRNT R1", "PRNT R2", "PRNT R3", "EOP"],
+    "division by zero": ["MOV R1 #5", "DIV R1 #0", "PRNT R1", "MOD R1 #0", "PRNT R1", "EOP"],
+    "stack": ["MOV R1 #5", "MOV R2 #9", "PUSH R1", "PUSH R2", "POP R3", "POP R4", "PRNT R3", "PRNT R4", "EOP"],
+    "variables": ["DEF x 2.5", "DEF y 4", "MOV R1 x", "MUL R1 y", "ADD R1 x", "PRNT R1", "EOP"],
+    "branches": ["MOV R1 #3", "top: JNE R1 #0 end", "SUB R1 #1", "JMP top", "end: PRNT R1", "EOP"],
+}
+
+
+def generated(seed):
+    # straight-line runs of the block-compiled operations, cut by jumps
+    rng = random.Random(seed)
+    lines = []
+    for i in range(rng.randint(10, 120)):
+        op = rng.choice(["ADD", "SUB", "MUL", "DIV", "MOD", "MOV", "PRNT", "JMP"])
+        dest = f"R{rng.randint(1, 7)}"
+        if op == "PRNT":
+            lines.append(f"PRNT {dest}")
+        elif op == "JMP":
+            lines.append(f"JMP #{rng.randint(0, 9)}")
+        else:
+            lines.append(f"{op} {dest} {rng.choice([f'R{rng.randint(1, 7)}', f'#{rng.randint(0, 9)}'])}")
+    return lines + ["EOP"]
+
+
+def execute(engine_name, source, machine=None):
+    machine = machine or storage.Machine()
+    program = engine(engine_name)(source, machine)
+    program.output = io.StringIO()
+    steps = program.run()
+    return program, (steps, program.output.getvalue(), machine.registers(), bytes(machine.memory.words()))
+
+
+cases = list(programs.items()) + [(f"seed {seed}", generated(seed)) for seed in range(30)]
+
+
+@pytest.mark.parametrize("engine_name", engines)
+@pytest.mark.parametrize("name,source", cases, ids=[name for name, source in cases])
+def test_engine_matches_interpreter(engine_name, name, source):
+    assert execute(engine_name, source)[1] == execute("interp", source)[1]
+
+
+@pytest.mark.parametrize("engine_name", ["interp"] + engines)
+def test_store_into_code_invalidates_translations(engine_name):
+    # the first run translates every instruction; the second pushes a zero word over the PRNT at 5,
+    # which must halt there on every engine instead of running a stale handler or block
+    source = ["MOV R1 #0", "MOV R2 #3", "PUSH R1", "PRNT R2", "ADD R2 #1", "PRNT R2", "ADD R2 #1", "PRNT R2", "EOP"]
+    machine = storage.Machine()
+    program, first = execute(engine_name, source, machine)
+    assert first[1] == "Printing: 3.0\nPrinting: 4.0\nPrinting: 5.0\nEnd of program\n"
+    for name, value in (("PC", 0), ("IR", 0), ("TSP", 4)):
+        machine.register.store(machine.slots[name], value)
+    program.output = io.StringIO()
+    program.run()
+    assert program.output.getvalue() == "Printing: 3.0\n"
+    assert machine.memory.loadWord(5) == 0
@@ -0,0 +1,35 @@
+import io
+import pytest
+import storage
+from run import engine
+
+engines = ["interp", "threaded", "block"]
+source = ["ADD R1 R2", "PUSH R1", "MUL R2 #2", "PRNT R1", "PRNT R2", "EOP"]
+
+
+def fresh(engine_name, preset):
+    machine = storage.Machine()
+    program = engine(engine_name)(source, machine)
+    for name, value in preset.items():
+        machine.register.store(machine.slots[name], value)
+    program.output = io.StringIO()
+    program.run()
+    return program.output.getvalue(), machine.registers()
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_each_preset_runs_like_a_fresh_machine(engine_name):
+    program = engine(engine_name)(source, storage.Machine())
+    presets = [{"R1": 5}, {"R1": 7, "R2": 3}, {}, {"R2": 1.5}]
+    for preset, result in zip(presets, program.runInputs(presets)):
+        assert result["error"] is None
+        assert (result["output"], result["registers"]) == fresh(engine_name, preset)
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_unknown_register_fails_only_its_run(engine_name):
+    program = engine(engine_name)(source, storage.Machine())
+    results = list(program.runInputs([{"R1": 5}, {"R9": 1}, {"R1": 7}]))
+    assert [result["error"] is None for result in results] == [True, False, True]
+    assert "R9" in results[1]["error"]
+    assert results[2]["output"] == fresh(engine_name, {"R1": 7})[0]
@@ -0,0 +1,32 @@
+import os
+import pytest
+import storage
+from assembler import Assembler, AssemblyError
+from objfile import ObjectFile
+from run import readProgram
+
+source = readProgram("testprog.txt") + ["DEF x 2.5", "loop: ADD R1 x", "EOP"]
+
+
+def stream(lines, filename):
+    return Assembler(storage.Machine()).streamObject(((i + 1, line) for i, line in enumerate(lines)), filename)
+
+
+def test_streamed_object_matches_assembled_object(tmp_path):
+    filename = str(tmp_path / "prog.isao")
+    stream(source, filename)
+    streamed, assembled = ObjectFile.read(filename), ObjectFile.assemble(source)
+    assert list(streamed.code) == list(assembled.code)
+    assert list(streamed.data) == list(assembled.data)
+    assert streamed.symbols == assembled.symbols
+    assert os.listdir(tmp_path) == ["prog.isao"]
+
+
+def test_failed_stream_keeps_the_last_good_object(tmp_path):
+    filename = str(tmp_path / "prog.isao")
+    stream(source, filename)
+    before = open(filename, "rb").read()
+    with pytest.raises(AssemblyError):
+        stream(source + ["FOO R1"], filename)
+    assert open(filename, "rb").read() == before
+    assert os.listdir(tmp_path) == ["prog.isao"]
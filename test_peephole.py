@@ -0,0 +1,72 @@
+import contextlib
+import io
+import random
+import pytest
+import storage
+from assembler import Assembler
+from run import engine
+
+engines = ["interp", "threaded", "block"]
+
+programs = {
+    "constants": ["MOV R1 #5", "MOV R2 #7", "ADD R1 R2", "MUL R1 #3", "PRNT R1", "EOP"],
+    "dead moves": ["MOV R1 #5", "MOV R1 #6", "MOV R2 R1", "MOV R2 #1", "SUB R2 R1", "PRNT R2", "EOP"],
+    "destination": ["MOV R3 #4", "MOV R4 R3", "ADD R4 #2", "PRNT R3", "PRNT R4", "EOP"],
+    "compare and branch": ["DEF x 3", "MOV R1 x", "top: JNE R1 #0 end", "SUB R1 #1", "end: PRNT R1", "EOP"],
+    "variables": ["DEF x 2.5", "DEF y 4", "MOV R1 x", "MUL R1 y", "DIV R1 #2", "MOD R1 #3", "PRNT R1", "EOP"],
+}
+
+
+def generated(seed):
+    # straight-line arithmetic, moves and forward branches over registers, immediates and variables;
+    # no [I1] operands, which read code words whose addresses the optimizer changes
+    rng = random.Random(seed)
+    lines, labels = [], ["end"]
+    register = lambda: f"R{rng.randint(1, 7)}"
+    source = lambda: rng.choice([register(), f"#{rng.randint(0, 20)}", str(rng.randint(0, 9)), "x", "y"])
+    for i in range(rng.randint(5, 40)):
+        label = ""
+        if rng.random() < 0.1:
+            label = f"L{i}: "
+            labels.append(f"L{i}")
+        kind = rng.random()
+        if kind < 0.3:
+            lines.append(f"{label}MOV {register()} {source()}")
+        elif kind < 0.6:
+            lines.append(f"{label}{rng.choice(['ADD', 'SUB', 'MUL', 'DIV', 'MOD'])} {register()} {source()}")
+        elif kind < 0.7:
+            lines.append(f"{label}PRNT {register()}")
+        elif kind < 0.85:
+            lines.append(f"{label}{rng.choice(['JEQ', 'JNE', 'JLT', 'JGE'])} {register()} {source()} TARGET")
+        else:
+            dest = rng.randint(1, 7)
+            lines.append(f"{label}MOV R{dest} {source()}")
+            lines.append(f"{rng.choice(['ADD', 'SUB', 'MUL'])} R{dest} {source()}")
+    return (["DEF x 3", "DEF y 2.5"] + [line.replace("TARGET", rng.choice(labels)) for line in lines]
+            + ["end: EOP"])
+
+
+def execute(engine_name, source, optimize):
+    machine = storage.Machine()
+    program = Assembler(machine, optimize=optimize).assemble(source)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        engine(engine_name)(program, machine).run()
+    return out.getvalue(), {f"R{i}": machine.register.load(machine.slots[f"R{i}"]) for i in range(1, 8)}
+
+
+cases = [(name, source) for name, source in programs.items()] + [(f"seed {seed}", generated(seed))
+                                                                   for seed in range(40)]
+
+
+@pytest.mark.parametrize("engine_name", engines)
+@pytest.mark.parametrize("name,source", cases, ids=[name for name, source in cases])
+def test_optimized_program_matches(engine_name, name, source):
+    assert execute(engine_name, source, True) == execute(engine_name, source, False)
+
+
+def test_optimizer_shrinks_programs():
+    assembler = Assembler(storage.Machine(), optimize=True)
+    assembler.assemble(programs["constants"])
+    stats = assembler.optimizer.stats()
+    assert stats["after"] < stats["before"]
@@ -0,0 +1,74 @@
+import io
+import pytest
+import storage
+from assembler import Assembler
+from decode import decode
+from pipeline import Pipeline
+from run import engine
+
+five = ["fetch", "decode", "execute", "memory", "writeback"]
+# each ADD reads the register the instruction before it wrote; the last MOV is independent
+chain = ["MOV R1 #5", "ADD R2 R1", "ADD R3 R2", "MOV R4 #1"]
+
+
+def timed(pipeline, source):
+    machine = storage.Machine()
+    pipeline.attach(machine)
+    for word in Assembler(machine).assemble(source).code:
+        pipeline.step(decode(word))
+    return pipeline.report()
+
+
+def test_raw_chain_stalls_until_writeback():
+    report = timed(Pipeline(), chain)
+    assert report["stalls"] == {"data": 2}
+    assert report["hazards"] == {"RAW": 2, "RAW stalled": 2}
+    # 4 instructions through 4 stages plus a stall per dependent ADD
+    assert (report["instructions"], report["cycles"]) == (4, 9)
+
+
+def test_forwarding_removes_the_chain_stalls():
+    report = timed(Pipeline(forwarding=True), chain)
+    assert report["stalls"] == {}
+    assert report["hazards"] == {"RAW": 2}
+    assert report["cycles"] == 7 and report["cpi"] == 7 / 4
+
+
+def test_load_use_stalls_once_with_forwarding():
+    report = timed(Pipeline(five, forwarding=True), ["MOV R1 72[I1]", "ADD R2 R1"])
+    assert report["stalls"] == {"data": 1}
+    assert report["cycles"] == 7
+    # an ALU result forwards without a stall
+    assert timed(Pipeline(five, forwarding=True), ["MOV R1 #3", "ADD R2 R1"])["stalls"] == {}
+
+
+def test_multicycle_latency_holds_execute():
+    report = timed(Pipeline(forwarding=True, latency={"MUL": 3}), ["MUL R1 #2", "MOV R4 #1"])
+    assert report["stalls"] == {"structural": 2}
+    assert report["cycles"] == 7
+
+
+def test_branch_flushes_the_younger_stages():
+    report = timed(Pipeline(), ["JMP #0", "MOV R4 #1"])
+    assert report["stalls"] == {"branch": 2} and report["branches"] == 1
+    assert timed(Pipeline(branch_penalty=0), ["JMP #0", "MOV R4 #1"])["stalls"] == {}
+
+
+@pytest.mark.parametrize("engine_name", ["interp", "threaded", "block"])
+def test_engines_report_the_interpreted_timing(engine_name):
+    # a timing model needs the per-step hooks, so every engine runs the reference interpreter
+    program = engine(engine_name)(chain + ["PRNT R3", "EOP"], storage.Machine())
+    program.output = io.StringIO()
+    program.pipeline = Pipeline(forwarding=True)
+    steps = program.run()
+    report = program.pipeline.report()
+    assert report["instructions"] == steps
+    assert report["hazards"] == {"RAW": 2}
+
+
+def test_stages_are_validated():
+    with pytest.raises(ValueError):
+        Pipeline(["fetch", "execute", "writeback"])
+    with pytest.raises(ValueError):
+        Pipeline(["fetch", "execute", "decode", "writeback"])
+    assert Pipeline.fromConfig({"forwarding": True, "latency": {"MUL": 3}}).latency == {"MUL": 3}
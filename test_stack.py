@@ -0,0 +1,64 @@
+import io
+import pytest
+import storage
+from assembler import Assembler
+from decode import decode
+from run import engine
+
+engines = ["interp", "threaded", "block"]
+
+
+def execute(engine_name, source, **registers):
+    machine = storage.Machine()
+    program = engine(engine_name)(source, machine)
+    for name, value in registers.items():
+        machine.register.store(machine.slots[name], value)
+    program.output = io.StringIO()
+    program.run()
+    return machine, program.output.getvalue()
+
+
+def slot(machine, name):
+    return machine.register.load(machine.slots[name])
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_push_and_pop_are_last_in_first_out(engine_name):
+    source = ["MOV R1 #5", "MOV R2 #9", "PUSH R1", "PUSH R2", "POP R3", "POP R4", "PRNT R3", "PRNT R4", "EOP"]
+    machine = storage.Machine()
+    bottom = slot(machine, "TSP")
+    machine, out = execute(engine_name, source)
+    assert out == "Printing: 9.0\nPrinting: 5.0\nEnd of program\n"
+    assert slot(machine, "TSP") == bottom
+    # pushed words stay in memory above the stack pointer
+    assert [machine.memory.load(int(bottom) + i) for i in (1, 2)] == [5.0, 9.0]
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_push_moves_the_stack_top(engine_name):
+    machine = storage.Machine()
+    bottom = slot(machine, "TSP")
+    machine, out = execute(engine_name, ["MOV R1 #7", "PUSH R1", "PUSH R1", "EOP"])
+    assert slot(machine, "TSP") == bottom + 2
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_pop_below_the_stack_pointer_underflows(engine_name):
+    with pytest.raises(RuntimeError, match="underflow"):
+        execute(engine_name, ["POP R1", "EOP"])
+
+
+def test_indexed_operands_encode_their_displacement():
+    machine = storage.Machine()
+    code = Assembler(machine).assemble(["DEF x 1", "MOV R1 72[I1]", "MOV R2 x[I1]", "EOP"]).code
+    operands = [(decode(word).mode2, decode(word).addr2) for word in code[:2]]
+    assert operands == [(0b100, 72), (0b100, machine.layout.mvpr)]
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_indexed_operands_read_displacement_plus_i1(engine_name):
+    source = ["DEF x 1", "DEF y 2", "DEF z 3", "MOV R1 x[I1]", "MOV R2 200[I1]", "PRNT R1", "PRNT R2", "EOP"]
+    machine, out = execute(engine_name, source, I1=2)
+    assert out == "Printing: 3.0\nPrinting: 3.0\nEnd of program\n"
+    machine, out = execute(engine_name, source, I1=1)
+    assert out == "Printing: 2.0\nPrinting: 2.0\nEnd of program\n"
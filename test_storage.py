@@ -0,0 +1,106 @@
+import contextlib
+import io
+import random
+import pytest
+import storage
+from run import engine
+
+engines = ["interp", "threaded", "block"]
+
+
+def execute(engine_name, source, machine):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        engine(engine_name)(source, machine).run()
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("engine_name", engines)
+@pytest.mark.parametrize("mem_len", [1024, 4096, 2**20])
+def test_def_program_on_scaled_layout(engine_name, mem_len):
+    machine = storage.Machine(storage.reg_len, mem_len, storage.Layout.scaled(mem_len), paged=True)
+    source = ["DEF x 5", "DEF y 2.5", "MOV R1 x", "ADD R1 y", "PRNT R1", "EOP"]
+    assert execute(engine_name, source, machine) == "Printing: 7.5\nEnd of program\n"
+    assert machine.registers()["R1"] == 7.5
+
+
+def test_scaled_layout_keeps_direct_regions_in_operand_range():
+    layout = storage.Layout.scaled(2**24)
+    assert all(getattr(layout, name) < 256 for name in storage.Layout.direct)
+    assert layout.mapr == 256
+    assert storage.Layout.scaled(256).key() == storage.Layout().key()
+
+
+def test_layout_rejects_direct_regions_past_operand_range():
+    with pytest.raises(ValueError):
+        storage.Layout(mspr=4096, mcpr=4200, mbpr=4300, mvpr=4400, mmpr=4500)
+    with pytest.raises(ValueError):
+        storage.Layout(mvpr=100)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_word_snapshots_restore_like_full_copies(seed):
+    # random stores, bulk stores, resets, snapshots and restores against full copies of the words
+    rng = random.Random(seed)
+    words = storage.WordStorage(size=64)
+    initial = words.image()
+    copies = []     # (snapshot, words when it was taken); a restore drops every later one
+    for i in range(300):
+        action = rng.random()
+        if action < 0.5:
+            words.storeWord(rng.randrange(80), rng.getrandbits(32))
+        elif action < 0.6:
+            address = rng.randrange(70)
+            words.storeWords(address, [rng.getrandbits(32) for k in range(rng.randint(1, 8))])
+        elif action < 0.65:
+            words.reset(initial)
+        elif action < 0.8:
+            copies.append((words.snapshot(), words.image()))
+        elif copies:
+            index = rng.randrange(len(copies))
+            snapshot, copy = copies[index]
+            words.restore(snapshot)
+            assert words.image() == copy
+            del copies[index + 1:]
+
+
+def test_word_snapshot_restore_only_touches_stored_words():
+    words = storage.WordStorage(size=1 << 16)
+    touched = []
+    snapshot = words.snapshot()
+    words.storeWord(5, 7)
+    words.storeWord(70000, 9)
+    words.hooks.append(touched.append)
+    words.restore(snapshot)
+    assert sorted(touched) == [5, 70000]
+    assert len(words.data) == 1 << 16 and words.loadWord(5) == 0
+    # restoring the same snapshot again only sees what was stored since
+    words.storeWord(6, 1)
+    del touched[:]
+    words.restore(snapshot)
+    assert touched == [6]
+
+
+def test_restored_snapshot_drops_later_snapshots():
+    words = storage.WordStorage(size=8)
+    first = words.snapshot()
+    words.storeWord(1, 1)
+    second = words.snapshot()
+    words.restore(first)
+    with pytest.raises(ValueError):
+        words.restore(second)
+
+
+def test_states_persist_only_when_asked(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "states", {})
+    monkeypatch.setattr(storage, "stateFile", None)
+    storage.Machine(storage.reg_len, 512)
+    assert list(tmp_path.iterdir()) == []
+    # with a state file, each process's saves merge with what the others saved
+    monkeypatch.setattr(storage, "stateFile", str(tmp_path / "machines.state"))
+    storage.Machine(storage.reg_len, 600)
+    monkeypatch.setattr(storage, "states", {})
+    storage.Machine(storage.reg_len, 700)
+    saved = storage.savedStates()
+    assert sorted(key[1] for key in saved) == [512, 600, 700] and storage.states.keys() == saved.keys()
+    assert [path.name for path in tmp_path.iterdir()] == ["machines.state"]
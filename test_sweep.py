@@ -0,0 +1,33 @@
+import sweep
+
+# three decimal places do not all survive the round trip, so every chunk has errors to merge
+settings = dict(max_e=6, dec=3, chunk=8, jobs=2)
+
+
+def test_resume_from_a_torn_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "sweep.ckpt")
+    whole = sweep.sweep(checkpoint=None, **settings)
+    assert whole
+    assert sweep.sweep(checkpoint=checkpoint, **settings) == whole
+    # an interrupted run: three finished chunks and a fourth cut off mid-line
+    with open(checkpoint) as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(checkpoint, "w") as f:
+        f.writelines(lines[:4] + [lines[4][:10]])
+    config = sweep.settings(settings["max_e"], settings["dec"], settings["chunk"], False)
+    assert len(sweep.readCheckpoint(checkpoint, config)) == 3
+    counts = []
+    resumed = sweep.sweep(checkpoint=checkpoint, progress=lambda finished, total: counts.append(finished), **settings)
+    assert resumed == whole
+    assert counts == list(range(4, 9))
+    assert len(sweep.readCheckpoint(checkpoint, config)) == 8
+    sweep.writeErrors(whole, str(tmp_path / "whole.csv"))
+    sweep.writeErrors(resumed, str(tmp_path / "resumed.csv"))
+    assert (tmp_path / "whole.csv").read_text() == (tmp_path / "resumed.csv").read_text()
+
+
+def test_checkpoint_of_other_settings_is_ignored(tmp_path):
+    checkpoint = str(tmp_path / "sweep.ckpt")
+    sweep.sweep(checkpoint=checkpoint, **settings)
+    config = sweep.settings(settings["max_e"], settings["dec"], 16, False)
+    assert sweep.readCheckpoint(checkpoint, config) == {}
@@ -0,0 +1,36 @@
+import pytest
+import storage
+import tracing
+from assembler import Assembler
+from run import readProgram
+
+source = readProgram("testprog.txt") + ["JNE R1 #0 end", "end: EOP"]
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = tracing.Tracer(tracing.DEBUG)
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    return tracer
+
+
+def encoded(tracer):
+    return [(pc, opcode, operands[0]) for kind, pc, opcode, operands, result in tracer.events if kind == "encode"]
+
+
+def test_assembled_operands_carry_their_code_address(tracer):
+    obj = Assembler(storage.Machine()).assemble(source)
+    events = encoded(tracer)
+    # one event per operand, in address order, covering every instruction word
+    assert [pc for pc, opcode, operand in events] == sorted(pc for pc, opcode, operand in events)
+    assert {pc for pc, opcode, operand in events} == set(range(len(obj.code) - 1))
+    assert events[:2] == [(0, "MOV", "R1"), (0, "MOV", "#5")]
+    assert (len(obj.code) - 2, "JNE", "end") in events
+
+
+def test_streamed_and_assembled_events_agree(tracer):
+    Assembler(storage.Machine()).assemble(source)
+    assembled = encoded(tracer)
+    tracer.clear()
+    Assembler(storage.Machine()).streamInto(enumerate(source, 1))
+    assert encoded(tracer) == assembled
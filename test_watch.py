@@ -0,0 +1,67 @@
+import io
+import os
+import pytest
+import run
+import storage
+from assembler import Assembler, IncrementalAssembler
+from run import engine
+
+engines = ["interp", "threaded", "block"]
+first = ["DEF x 4", "MOV R1 #5", "ADD R1 x", "loop: SUB R1 #1", "JNE R1 #0 loop", "PRNT R1", "PRNT R2", "EOP"]
+# one line changed, one inserted before the label, one removed
+second = ["DEF x 4", "MOV R1 #6", "MOV R2 #3", "ADD R1 x", "loop: SUB R1 #1", "JNE R1 #0 loop", "PRNT R1",
+          "EOP"]
+
+
+def test_incremental_assembler_reuses_unchanged_statements():
+    machine = storage.Machine()
+    assembler = IncrementalAssembler(machine)
+    assembler.assemble(first)
+    assert (assembler.encoded, assembler.reused) == (len(first), 0)
+    obj = assembler.assemble(second)
+    # the two new lines and the jump to the moved label are encoded again
+    assert (assembler.encoded, assembler.reused) == (3, len(second) - 3)
+    assert obj.code == Assembler(storage.Machine()).assemble(second).code
+    assembler.assemble(second)
+    assert (assembler.encoded, assembler.reused) == (0, len(second))
+
+
+def execute(program):
+    program.output = io.StringIO()
+    program.run()
+    return program.output.getvalue(), program.machine.registers()
+
+
+@pytest.mark.parametrize("engine_name", engines)
+def test_reload_matches_a_fresh_machine(engine_name):
+    machine = storage.Machine()
+    assembler = IncrementalAssembler(machine)
+    program = engine(engine_name)(assembler.assemble(first), machine)
+    image = machine.snapshot()
+    execute(program)
+    for source in (second, first, second):
+        image = program.reload(assembler.assemble(source), image)
+        fresh = engine(engine_name)(source, storage.Machine())
+        assert execute(program) == execute(fresh)
+        assert machine.memory.words() == fresh.machine.memory.words()
+
+
+def test_watch_reruns_on_change(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "prog.txt"
+    source.write_text("\n".join(first) + "\n")
+    edits = [second]
+
+    def sleep(interval):
+        # between polls: one edit, then the interrupt that ends watch()
+        if not edits:
+            raise KeyboardInterrupt
+        source.write_text("\n".join(edits.pop()) + "\n")
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    monkeypatch.setattr(run.time, "sleep", sleep)
+    run.watch(str(source), "block", storage.Machine())
+    out = capsys.readouterr().out
+    assert out == ("Printing: 8.0\nPrinting: 0.0\nEnd of program\n"
+                   f"--- {source} changed: 3 lines encoded, {len(second) - 3} reused\n"
+                   "Printing: 9.0\nEnd of program\n")
@@ -0,0 +1,206 @@
+from addressing import AddressingMode
+from decode import DecodeCache
+from run import Program
+
+
+class Handlers(dict):
+    """
+    Pre-bound handlers keyed by memory address, translated on first use.
+    A store into a translated address drops its handler.
+    """
+    def __init__(self, program):
+        super().__init__()
+        self.program = program
+        program.machine.memory.hooks.append(self.invalidate)
+
+    def __missing__(self, address):
+        handler = self[address] = self.program.translate(address)
+        return handler
+
+    def invalidate(self, address):
+        if address is None:
+            self.clear()
+        else:
+            self.pop(address, None)
+
+    def close(self):
+        hooks = self.program.machine.memory.hooks
+        if self.invalidate in hooks:
+            hooks.remove(self.invalidate)
+
+
+class ThreadedProgram(Program):
+    """
+    Closure-compiled ("threaded code") engine.
+    Every instruction is translated once into a callable with its operand fetchers
+    already resolved, so the run loop only calls handlers[pc]().
+    Handlers return None to continue, 1 after EOP and 0 on the halting zero word.
+    """
+    def __init__(self, program, machine=None):
+        super().__init__(program, machine)
+        self.handlers = Handlers(self)
+        for address in range(len(self.program)):
+            self.handlers[address]
+
+    def close(self):
+        self.handlers.close()
+
+    def run(self, resume=False):
+        self.attached()
+        if self.observed():
+            # traced and profiled runs go through the reference interpreter, which reports every step
+            return Program.run(self, resume)
+        pc_addr = self.machine.slots['PC']
+        ir_addr = self.machine.slots['IR']
+        handlers = self.handlers
+        pc = ir = int(self.machine.register.load(pc_addr, isCode=False))
+        if resume:
+            ir = int(self.machine.register.load(ir_addr, isCode=False))
+        steps = 0
+        try:
+            while True:
+                stop = handlers[ir]()
+                if stop is not None:
+                    steps += stop
+                    break
+                steps += 1
+                ir, pc = pc, pc + 1
+        finally:
+            self.machine.register.store(ir_addr, ir)
+            self.machine.register.store(pc_addr, pc)
+            self.output.flush()
+        return steps
+
+    def translate(self, address):
+        instruction = DecodeCache.of(self.machine.memory).fetch(address)
+        if instruction is None:
+            return lambda: 0
+        operation = instruction.name
+        fetch1 = self.fetcher(instruction.mode1, instruction.addr1)
+        fetch2 = self.fetcher(instruction.mode2, instruction.addr2)
+
+        if instruction.code >> 4:
+            if operation in ["ADD", "SUB", "MUL", "DIV", "MOD"]:
+                return self.arithmetic(operation, instruction.extra or instruction.addr1, fetch1, fetch2)
+            if instruction.extra:
+                # fused compare-and-branch, see peephole.py
+                return self.arithmetic("SUB", instruction.addr1, fetch1, fetch2)
+            execute = self.execute
+            def handler():
+                op1 = fetch1()
+                execute(None, operation, op1, fetch2())
+            return handler
+        if instruction.code >> 3 & 1:
+            write = self.write
+            if operation == "MOV" or operation == "POP":
+                dest = self.register(instruction.addr1)
+                def handler():
+                    fetch1()
+                    write(dest(), fetch2(), operation)
+                return handler
+            if operation == "PUSH":
+                def handler():
+                    op1 = fetch1()
+                    fetch2()
+                    write(None, op1, "PUSH")
+                return handler
+            if operation == "SCAN":
+                dest = self.register(instruction.addr1)
+                scan = self.scan
+                def handler():
+                    fetch1()
+                    fetch2()
+                    write(dest(), scan(), "SCAN")
+                return handler
+            def handler():
+                op1 = fetch1()
+                write(op1, fetch2(), operation)
+            return handler
+        emit = self.emit
+        if operation == "PRNT":
+            def handler():
+                op1 = fetch1()
+                fetch2()
+                emit(f"Printing: {op1}")
+            return handler
+        if operation == "EOP":
+            def handler():
+                fetch1()
+                fetch2()
+                emit("End of program")
+                return 1
+            return handler
+        def handler():
+            fetch1()
+            fetch2()
+        return handler
+
+    def arithmetic(self, operation, dest_num, fetch1, fetch2):
+        dest = self.register(dest_num)
+        store = self.machine.register.store
+        exception = self.exception
+        emit = self.emit
+        if operation == "ADD":
+            def handler():
+                op1 = fetch1()
+                result = op1 + fetch2()
+                store(dest(), result)
+        elif operation == "SUB":
+            def handler():
+                op1 = fetch1()
+                result = op1 - fetch2()
+                store(dest(), result)
+        elif operation == "MUL":
+            def handler():
+                op1 = fetch1()
+                result = op1 * fetch2()
+                store(dest(), result)
+        else:
+            divide = (lambda a, b: a // b) if operation == "DIV" else (lambda a, b: a % b)
+            def handler():
+                op1 = fetch1()
+                op2 = fetch2()
+                if op2 == 0:
+                    emit(exception("DivisionByZero", 0).message)
+                    result = 0
+                else:
+                    result = divide(op1, op2)
+                store(dest(), result)
+        return handler
+
+    def register(self, num):
+        """
+        Resolves R<num> to its register slot once; unknown names fail when executed, like the interpreter.
+        """
+        operandSlot = self.machine.operandSlot
+        reg_addr = self.machine.operands[num]
+        if reg_addr is None:
+            return lambda: operandSlot(num)
+        return lambda: reg_addr
+
+    def fetcher(self, mode, addr):
+        """
+        Operand fetcher for one addressing mode, bound to its operand.
+        """
+        if mode == 0b000 or mode == 0b011:
+            return lambda: addr
+        if mode == 0b001:
+            load = self.machine.register.load
+            operandSlot = self.machine.operandSlot
+            reg_addr = self.machine.operands[addr]
+            if reg_addr is None:
+                return lambda: load(operandSlot(addr))
+            return lambda: load(reg_addr)
+        if mode == 0b010:
+            load = self.machine.memory.load
+            return lambda: load(addr)
+        if mode == 0b100:
+            load = self.machine.memory.load
+            index = self.machine.register.load
+            index_reg = self.machine.slots['I1']
+            return lambda: load(index(index_reg) + addr)
+        if mode == 0b101:
+            stack = AddressingMode.stack
+            machine = self.machine
+            return lambda: stack("pop", machine)
+        return lambda: self.fetchOp(mode, addr)
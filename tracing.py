@@ -0,0 +1,53 @@
+from collections import deque
+
+OFF = 0
+INFO = 1  # control flow: jumps, calls, returns, scans, end of program
+DEBUG = 2  # every executed instruction and every assembled operand
+levels = {"off": OFF, "info": INFO, "debug": DEBUG}
+control = {"JEQ", "JNE", "JLT", "JLE", "JGT", "JGE", "JMP", "CALL", "RET", "SCAN", "EOP"}
+
+# default tracer picked up by new programs and the legacy encoder; None means tracing is off
+tracer = None
+
+
+class Tracer:
+    """
+    Fixed-size ring buffer of structured events (kind, pc, opcode, operands, result).
+    Callers only build events after checking the tracer exists, so a disabled trace costs nothing.
+    """
+    def __init__(self, level=INFO, size=4096):
+        self.level = level
+        self.events = deque(maxlen=size)
+        self.dropped = 0
+
+    def emit(self, level, kind, pc=None, opcode=None, operands=(), result=None):
+        if level <= self.level:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append((kind, pc, opcode, operands, result))
+
+    def step(self, pc, opcode, op1, op2, result=None):
+        # one executed instruction; control flow is INFO, everything else DEBUG
+        if opcode in control:
+            self.emit(INFO, "control", pc, opcode, (op1, op2), result)
+        elif self.level >= DEBUG:
+            self.emit(DEBUG, "step", pc, opcode, (op1, op2), result)
+
+    def format(self):
+        lines = []
+        if self.dropped:
+            lines.append(f"# {self.dropped} older events dropped\n")
+        for kind, pc, opcode, operands, result in self.events:
+            operands = " ".join(str(operand) for operand in operands)
+            lines.append(f"{kind}\t{'' if pc is None else pc}\t{opcode or ''}\t{operands}\t"
+                         f"{'' if result is None else result}\n")
+        return "".join(lines)
+
+    def dump(self, filename):
+        # one bulk write of the whole buffer
+        with open(filename, "w") as f:
+            f.write(self.format())
+
+    def clear(self):
+        self.events.clear()
+        self.dropped = 0